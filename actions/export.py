@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any
+from slack_bolt import Ack, Respond
+from slack_sdk import WebClient
+from config import ALLOWED_CHANNEL_ID, EXPORT_PROGRESS_INTERVAL
+from utils.slack_utils import is_user_authorized
+from utils.search_sessions import search_sessions
+from utils.export import EXPORT_COLUMNS, export_pages, scheduled_pages, write_export, upload_file
+
+
+async def export_results(
+    client: WebClient, ack: Ack, body: Dict[str, Any], respond: Respond
+) -> None:
+    await ack()
+    if not await is_user_authorized(body["user"]["id"]):
+        await respond(text="🚫 You don't have permission to perform this action.", replace_original=False)
+        return
+
+    metadata: Dict[str, Any] = json.loads(body["actions"][0]["value"])
+    session = search_sessions.get(metadata.get("session"))
+    if session is None:
+        await respond(text="⌛ This search has expired. Please run it again from `/sonar`.", replace_original=False)
+        return
+    search_type: str = session.search_type
+    file_format: str = metadata.get("format", "csv")
+    filename = f"sonar-{search_type}-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{file_format}.gz"
+
+    progress_message = await client.chat_postMessage(
+        channel=ALLOWED_CHANNEL_ID,
+        text=f"📤 Exporting {filename}...",
+    )
+    last_update = time.monotonic()
+
+    async def report_progress(rows: int) -> None:
+        nonlocal last_update
+        if time.monotonic() - last_update < EXPORT_PROGRESS_INTERVAL:
+            return
+        last_update = time.monotonic()
+        await client.chat_update(
+            channel=ALLOWED_CHANNEL_ID,
+            ts=progress_message["ts"],
+            text=f"📤 Exporting {filename}... {rows} rows so far",
+        )
+
+    fd, path = tempfile.mkstemp(suffix=f".{file_format}.gz")
+    os.close(fd)
+    try:
+        print(f"📤 Exporting {search_type} results as {file_format}")
+        pages = scheduled_pages(
+            body["user"]["id"],
+            export_pages(
+                search_type,
+                user_id=session.user_id,
+                ip_address=session.ip_address,
+                start_date=session.start_date,
+                end_date=session.end_date,
+                confidence_threshold=session.confidence_threshold or 0.5,
+            ),
+        )
+        rows = await write_export(pages, path, file_format, EXPORT_COLUMNS[search_type], report_progress)
+        await client.chat_update(
+            channel=ALLOWED_CHANNEL_ID,
+            ts=progress_message["ts"],
+            text=f"📤 Uploading {filename} ({rows} rows)...",
+        )
+        await upload_file(
+            client, path, filename, ALLOWED_CHANNEL_ID,
+            f"📦 Export of {rows} rows requested by <@{body['user']['id']}>",
+        )
+        await client.chat_update(
+            channel=ALLOWED_CHANNEL_ID,
+            ts=progress_message["ts"],
+            text=f"✅ Exported {rows} rows to {filename}.",
+        )
+    except Exception as e:
+        await client.chat_update(
+            channel=ALLOWED_CHANNEL_ID,
+            ts=progress_message["ts"],
+            text=f"❌ Error exporting results: {str(e)}",
+        )
+    finally:
+        os.remove(path)
@@ -1,8 +1,8 @@
 import json
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, List
 from slack_bolt import Ack, Respond
 from utils.slack_utils import format_slack_message, is_user_authorized
-from utils.elastic_search import standard_search, unique_ip_search, unique_user_search
+from utils.search_sessions import search_sessions, PAGE_SIZE
 
 
 async def load_more(
@@ -15,56 +15,28 @@ async def load_more(
 
     metadata: Dict[str, Any] = json.loads(body["actions"][0]["value"])
     page: int = int(metadata.get("page", 1))
-    user_id: str = metadata.get("user_id", "")
-    ip_address: str = metadata.get("ip_address", "")
-    search_type: str = metadata.get("search_type", "")
-    start_date: str = metadata.get("start_date", "")
-    end_date: str = metadata.get("end_date", "")
+    session = search_sessions.get(metadata.get("session"))
+    if session is None:
+        await respond(text="⌛ This search has expired. Please run it again from `/sonar`.", replace_original=False)
+        return
 
     try:
-        data, total = await get_search_results(
-            search_type, user_id, ip_address, page, start_date, end_date
-        )
+        data, total, partial = await session.get_page(page)
 
         message_blocks: List[Dict[str, Any]] = format_slack_message(
             data,
             total,
             page,
-            size=10,
-            user_id=user_id,
-            ip_address=ip_address,
-            start_date=start_date,
-            end_date=end_date,
-            search_type=search_type, 
+            size=PAGE_SIZE,
+            user_id=session.user_id,
+            ip_address=session.ip_address,
+            start_date=session.start_date,
+            end_date=session.end_date,
+            search_type=session.search_type,
+            session_token=session.token,
+            partial=partial,
         )
         await respond(blocks=message_blocks, replace_original=True)
+        session.prefetch(page + 1)
     except Exception as e:
         await respond(text=f"⚠️ Error loading more data: {str(e)}")
-
-
-async def get_search_results(
-    search_type: str, user_id: str, ip_address: str, page: int, start_date: str, end_date: str
-) -> Tuple[List[Dict[str, Any]], int]:
-    if search_type == "standard_search":
-        data, total = await standard_search(
-            user_id=user_id, ip_address=ip_address, page=page,
-            start_date=start_date, end_date=end_date
-        )
-    elif search_type == "unique_user_for_ip":
-        data, total = await unique_user_search(ip_address=ip_address, page=page,
-            start_date=start_date, end_date=end_date)
-    elif search_type == "unique_ip_for_user":
-        data, total = await unique_ip_search(user_id=user_id, page=page,
-            start_date=start_date, end_date=end_date)
-    elif search_type == "date_range":
-        data, total = await standard_search(
-            user_id=user_id,
-            ip_address=ip_address,
-            start_date=start_date,
-            end_date=end_date,
-            page=page,
-        )
-    else:
-        raise ValueError(f"Invalid search type: {search_type}")
-
-    return data, total
@@ -1,7 +1,10 @@
 from typing import Dict, Any
 from slack_sdk import WebClient
 from commands.fetch_data import get_search_modal_view
-# from commands.find_alts import get_find_alts_modal_view
+from commands.find_alts import get_find_alts_modal_view
+from commands.batch import get_batch_modal_view
+from commands.watchlist import get_watchlist_modal_view
+from utils.watchlist import load_watch_entries
 
 
 async def handle_sonar_action(client: WebClient, ack, body: Dict[str, Any]):
@@ -19,4 +22,14 @@ async def handle_sonar_action(client: WebClient, ack, body: Dict[str, Any]):
         await client.views_update(
             view_id=body["container"]["view_id"],
             view=get_find_alts_modal_view()
-        ) 
\ No newline at end of file
+        ) 
+    elif action_id == "batch_action":
+        await client.views_update(
+            view_id=body["container"]["view_id"],
+            view=get_batch_modal_view()
+        )
+    elif action_id == "watchlist_action":
+        await client.views_update(
+            view_id=body["container"]["view_id"],
+            view=get_watchlist_modal_view(await load_watch_entries())
+        )
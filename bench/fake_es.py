@@ -0,0 +1,126 @@
+import asyncio
+import json
+from collections import defaultdict
+from typing import Any, Dict
+from aiohttp import web
+
+HEADERS = {"X-Elastic-Product": "Elasticsearch"}
+
+
+class FakeElasticsearch:
+    """In-memory stand-in for the handful of ES endpoints the ingester uses."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.indices: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        self.aliases: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        self.bulk_requests = 0
+
+    def count(self, prefix: str) -> int:
+        return sum(len(docs) for name, docs in self.indices.items() if name.startswith(prefix))
+
+    def clear(self, prefix: str) -> None:
+        for name in self.indices:
+            if name.startswith(prefix):
+                self.indices[name].clear()
+
+    def respond(self, body: Dict[str, Any], status: int = 200) -> web.Response:
+        return web.json_response(body, status=status, headers=HEADERS)
+
+    async def delay(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def info(self, request: web.Request) -> web.Response:
+        return self.respond({"version": {"number": "8.15.0"}, "tagline": "You Know, for Search"})
+
+    async def create_index(self, request: web.Request) -> web.Response:
+        index = request.match_info["index"]
+        if index in self.indices:
+            return self.respond({"error": {"type": "resource_already_exists_exception"}, "status": 400}, 400)
+        self.indices[index] = {}
+        return self.respond({"acknowledged": True, "index": index})
+
+    async def put_template(self, request: web.Request) -> web.Response:
+        return self.respond({"acknowledged": True})
+
+    async def index_exists(self, request: web.Request) -> web.Response:
+        return web.Response(status=200 if request.match_info["index"] in self.indices else 404, headers=HEADERS)
+
+    async def alias_exists(self, request: web.Request) -> web.Response:
+        return web.Response(status=404, headers=HEADERS)
+
+    async def put_alias(self, request: web.Request) -> web.Response:
+        self.aliases[request.match_info["name"]][request.match_info["index"]] = {}
+        return self.respond({"acknowledged": True})
+
+    async def get_alias(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        if name not in self.aliases:
+            return self.respond({"error": f"alias [{name}] missing", "status": 404}, 404)
+        return self.respond({index: {"aliases": {name: {}}} for index in self.aliases[name]})
+
+    async def get_doc(self, request: web.Request) -> web.Response:
+        index, doc_id = request.match_info["index"], request.match_info["id"]
+        source = self.indices[index].get(doc_id)
+        if source is None:
+            return self.respond({"_index": index, "_id": doc_id, "found": False}, 404)
+        return self.respond({"_index": index, "_id": doc_id, "found": True, "_source": source})
+
+    async def update_doc(self, request: web.Request) -> web.Response:
+        await self.delay()
+        index, doc_id = request.match_info["index"], request.match_info["id"]
+        body = await request.json()
+        self.indices[index].setdefault(doc_id, {}).update(body.get("doc", {}))
+        return self.respond({"_index": index, "_id": doc_id, "result": "updated"})
+
+    async def bulk(self, request: web.Request) -> web.Response:
+        await self.delay()
+        self.bulk_requests += 1
+        lines = [line for line in (await request.text()).split("\n") if line]
+        items, errors = [], False
+        for action_line, source_line in zip(lines[::2], lines[1::2]):
+            op_type, meta = next(iter(json.loads(action_line).items()))
+            index = meta.get("_index") or request.match_info.get("index")
+            docs = self.indices[index]
+            if op_type == "create" and meta["_id"] in docs:
+                errors = True
+                items.append({op_type: {
+                    "_index": index, "_id": meta["_id"], "status": 409,
+                    "error": {"type": "version_conflict_engine_exception"},
+                }})
+                continue
+            source = json.loads(source_line)
+            if op_type == "update":
+                # Scripts are not evaluated; an upsert seeds missing documents.
+                docs.setdefault(meta["_id"], source.get("upsert") or source.get("doc", {}))
+                items.append({op_type: {"_index": index, "_id": meta["_id"], "status": 200, "result": "updated"}})
+                continue
+            docs[meta["_id"]] = source
+            items.append({op_type: {"_index": index, "_id": meta["_id"], "status": 201, "result": "created"}})
+        return self.respond({"took": 1, "errors": errors, "items": items})
+
+    async def search(self, request: web.Request) -> web.Response:
+        await self.delay()
+        docs = self.indices.get(request.match_info["index"], {})
+        return self.respond({
+            "took": 1,
+            "timed_out": False,
+            "hits": {"total": {"value": len(docs), "relation": "eq"}, "hits": []},
+        })
+
+    def app(self) -> web.Application:
+        application = web.Application(client_max_size=256 * 1024 * 1024)
+        application.router.add_get("/", self.info)
+        application.router.add_route("*", "/_bulk", self.bulk)
+        application.router.add_put("/_index_template/{name}", self.put_template)
+        application.router.add_head("/_alias/{name}", self.alias_exists)
+        application.router.add_get("/_alias/{name}", self.get_alias, allow_head=False)
+        application.router.add_put("/{index}", self.create_index)
+        application.router.add_head("/{index}", self.index_exists)
+        application.router.add_put("/{index}/_alias/{name}", self.put_alias)
+        application.router.add_get("/{index}/_doc/{id}", self.get_doc)
+        application.router.add_post("/{index}/_update/{id}", self.update_doc)
+        application.router.add_route("*", "/{index}/_bulk", self.bulk)
+        application.router.add_route("*", "/{index}/_search", self.search)
+        return application
@@ -0,0 +1,108 @@
+import asyncio
+import bisect
+import random
+import time
+from typing import Any, Dict, List, Optional
+from aiohttp import web
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/126.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 Version/17.5 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:127.0) Gecko/20100101 Firefox/127.0",
+    "Slack/4.39.95 (Linux; x64)",
+]
+COUNTRIES = [("US", "California"), ("IN", "Maharashtra"), ("GB", "England"), ("DE", "Berlin")]
+
+
+class FakeSlack:
+    """Local stand-in for team.accessLogs serving synthetic logins newest first."""
+
+    def __init__(
+        self,
+        records: int,
+        start: int,
+        end: int,
+        users: int = 5000,
+        duplicate_rate: float = 0.0,
+        latency: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.random = random.Random(seed)
+        self.users = users
+        self.duplicate_rate = duplicate_rate
+        self.latency = latency
+        self.requests = 0
+        self.messages = 0
+        # Stored oldest first so bisect works on date_last; served reversed.
+        self.logins: List[Dict[str, Any]] = []
+        self.keys: List[int] = []
+        timestamps = sorted(self.random.randint(start, end) for _ in range(records))
+        for date_last in timestamps:
+            self.append(self.make_login(date_last))
+
+    def make_login(self, date_last: int) -> Dict[str, Any]:
+        if self.logins and self.random.random() < self.duplicate_rate:
+            # Same user and date_last as an earlier login, so the same document ID.
+            return dict(self.logins[self.random.randrange(len(self.logins))])
+        user = self.random.randrange(self.users)
+        country, region = self.random.choice(COUNTRIES)
+        return {
+            "user_id": f"U{user:08d}",
+            "username": f"user{user}",
+            "date_first": date_last - self.random.randint(0, 86400 * 30),
+            "date_last": date_last,
+            "count": self.random.randint(1, 50),
+            "ip": f"10.{self.random.randrange(256)}.{self.random.randrange(256)}.{self.random.randrange(1, 255)}",
+            "user_agent": self.random.choice(USER_AGENTS),
+            "isp": "Synthetic ISP",
+            "country": country,
+            "region": region,
+        }
+
+    def append(self, login: Dict[str, Any]) -> None:
+        index = bisect.bisect_right(self.keys, login["date_last"])
+        self.keys.insert(index, login["date_last"])
+        self.logins.insert(index, login)
+
+    def add_recent(self, count: int) -> None:
+        now = int(time.time())
+        for _ in range(count):
+            self.append(self.make_login(now))
+
+    def page(self, limit: int, cursor: int, before: Optional[int]) -> Dict[str, Any]:
+        end = len(self.logins) if before is None else bisect.bisect_right(self.keys, before)
+        end -= cursor
+        start = max(0, end - limit)
+        logins = list(reversed(self.logins[start:end])) if end > 0 else []
+        next_cursor = str(cursor + len(logins)) if start > 0 else ""
+        return {
+            "ok": True,
+            "logins": logins,
+            "response_metadata": {"next_cursor": next_cursor},
+        }
+
+    async def access_logs(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        params = dict(request.query)
+        if request.can_read_body:
+            params.update(await request.post())
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        before = params.get("before")
+        return web.json_response(
+            self.page(
+                limit=int(params.get("limit", 100)),
+                cursor=int(params.get("cursor") or 0),
+                before=int(before) if before else None,
+            )
+        )
+
+    async def post_message(self, request: web.Request) -> web.Response:
+        self.messages += 1
+        return web.json_response({"ok": True, "channel": "C0BENCH", "ts": f"{time.time():.6f}"})
+
+    def app(self) -> web.Application:
+        application = web.Application()
+        application.router.add_route("*", "/api/team.accessLogs", self.access_logs)
+        application.router.add_route("*", "/api/chat.postMessage", self.post_message)
+        return application
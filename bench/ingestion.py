@@ -0,0 +1,174 @@
+"""Ingestion benchmark against local Slack and Elasticsearch stand-ins.
+
+Usage: python -m bench.ingestion --records 50000 --duplicate-rate 0.1
+"""
+import argparse
+import asyncio
+import os
+import resource
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+from aiohttp import web
+from .fake_es import FakeElasticsearch
+from .fake_slack import FakeSlack
+
+SLACK_PORT = 18080
+ES_PORT = 19200
+INDEX = "sonar-bench"
+# Monthly log indices, excluding the checkpoint and rollup indices.
+LOG_INDICES = f"{INDEX}-v"
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    # config reads the environment at import time, so this must run before
+    # anything from the app is imported.
+    os.environ.update({
+        "SLACK_API_URL": f"http://127.0.0.1:{SLACK_PORT}/api/",
+        "SLACK_USER_TOKEN": "xoxp-bench",
+        "SLACK_BOT_TOKEN": "xoxb-bench",
+        "ES_HOST": "127.0.0.1",
+        "ES_PORT": str(ES_PORT),
+        "ES_SCHEME": "http",
+        "ES_INDEX": INDEX,
+        "ES_API_KEY": "bench",
+        "PORT": "0",
+        "SPOOL_DIR": tempfile.mkdtemp(prefix="sonar-bench-spool-"),
+        "SPOOL_ROLL_SECONDS": "0.5",
+        "INCREMENTAL_POLL_INTERVAL": str(args.poll_interval),
+        "BACKFILL_WINDOWS": str(args.windows),
+    })
+
+
+def timed(samples: List[float], func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - started)
+    return wrapper
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[int(pct) - 1]
+
+
+def report(name: str, docs: int, elapsed: float, page_times: List[float]) -> None:
+    print(
+        f"{name:<12} {docs:>8} docs  {docs / max(elapsed, 1e-9):>10.1f} docs/s  "
+        f"page p50 {percentile(page_times, 50) * 1000:>8.1f} ms  "
+        f"p99 {percentile(page_times, 99) * 1000:>8.1f} ms"
+    )
+
+
+async def start_server(application: web.Application, port: int) -> web.AppRunner:
+    runner = web.AppRunner(application)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def wait_for_spool(spool: Any) -> None:
+    while spool.sealed or spool.active is not None:
+        await asyncio.sleep(0.1)
+
+
+async def run(args: argparse.Namespace) -> None:
+    configure_environment(args)
+    from config import es
+    from utils import rate_limit
+    from utils.elastic_search import create_index
+    from logs import data_fetcher
+    from logs.checkpoints import create_checkpoint_index
+    from logs.index_logs import index_logs
+
+    if not args.rate_limit:
+        for tier in rate_limit.TIER_LIMITS:
+            rate_limit.TIER_LIMITS[tier] = 1e9
+
+    start = int(datetime(2023, 1, 1, tzinfo=timezone.utc).timestamp())
+    slack = FakeSlack(
+        records=args.records,
+        start=start,
+        end=int(time.time()) - 3600,
+        duplicate_rate=args.duplicate_rate,
+        latency=args.slack_latency,
+    )
+    elastic = FakeElasticsearch(latency=args.es_latency)
+    runners = [
+        await start_server(slack.app(), SLACK_PORT),
+        await start_server(elastic.app(), ES_PORT),
+    ]
+
+    fetch_times: List[float] = []
+    data_fetcher.fetch_logs = timed(fetch_times, data_fetcher.fetch_logs)
+    await create_index()
+    await create_checkpoint_index()
+    replay_task = asyncio.create_task(data_fetcher.replay_spool())
+
+    print(f"Slack latency {args.slack_latency * 1000:.0f} ms, ES latency {args.es_latency * 1000:.0f} ms, "
+          f"duplicate rate {args.duplicate_rate:.0%}")
+
+    started = time.perf_counter()
+    await data_fetcher.fetch_historical_data()
+    await wait_for_spool(data_fetcher.spool)
+    historical_docs = elastic.count(LOG_INDICES)
+    report("historical", historical_docs, time.perf_counter() - started, fetch_times)
+
+    fetch_times.clear()
+    incremental_task = asyncio.create_task(data_fetcher.fetch_incremental_data())
+    started = time.perf_counter()
+    for _ in range(args.polls):
+        slack.add_recent(args.new_per_poll)
+        await asyncio.sleep(args.poll_interval)
+    await wait_for_spool(data_fetcher.spool)
+    incremental_task.cancel()
+    report(
+        "incremental",
+        elastic.count(LOG_INDICES) - historical_docs,
+        time.perf_counter() - started,
+        fetch_times,
+    )
+    replay_task.cancel()
+
+    batch_times: List[float] = []
+    batches: List[List[Dict[str, Any]]] = [
+        slack.page(500, offset, None)["logins"] for offset in range(0, args.records, 500)
+    ]
+    elastic.clear(LOG_INDICES)
+    started = time.perf_counter()
+    timed_index = timed(batch_times, index_logs)
+    for batch in batches:
+        await timed_index(batch)
+    report("index_logs", sum(len(batch) for batch in batches), time.perf_counter() - started, batch_times)
+
+    print(f"Slack requests {slack.requests}, alerts posted {slack.messages}, ES bulk requests {elastic.bulk_requests}")
+    print(f"Peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+    await es.close()
+    for runner in runners:
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Sonar ingestion against local stand-ins.")
+    parser.add_argument("--records", type=int, default=20000, help="synthetic logins in the access log")
+    parser.add_argument("--duplicate-rate", type=float, default=0.05, help="fraction of logins repeating an earlier document ID")
+    parser.add_argument("--slack-latency", type=float, default=0.05, help="seconds added to each team.accessLogs call")
+    parser.add_argument("--es-latency", type=float, default=0.01, help="seconds added to each ES request")
+    parser.add_argument("--windows", type=int, default=1, help="BACKFILL_WINDOWS for the historical run")
+    parser.add_argument("--polls", type=int, default=5, help="incremental polls to run")
+    parser.add_argument("--new-per-poll", type=int, default=100, help="new logins added before each poll")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="INCREMENTAL_POLL_INTERVAL in seconds")
+    parser.add_argument("--rate-limit", action="store_true", help="keep Slack's real tier limits instead of lifting them")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+from typing import Dict, Any
+from config import BATCH_MAX_ENTITIES
+
+
+def get_batch_modal_view() -> Dict[str, Any]:
+    return {
+        "type": "modal",
+        "callback_id": "batch_modal",
+        "title": {"type": "plain_text", "text": "📋 Batch Investigation"},
+        "blocks": [
+            {
+                "type": "input",
+                "block_id": "entities_input",
+                "element": {
+                    "type": "plain_text_input",
+                    "action_id": "entities_input",
+                    "multiline": True,
+                    "placeholder": {"type": "plain_text", "text": "U12345ABC, U67890DEF, 192.168.0.1..."},
+                },
+                "label": {"type": "plain_text", "text": "User IDs and IP Addresses"},
+                "optional": True,
+            },
+            {
+                "type": "input",
+                "block_id": "entities_file",
+                "element": {
+                    "type": "file_input",
+                    "action_id": "entities_file",
+                    "filetypes": ["txt", "csv"],
+                    "max_files": 1,
+                },
+                "label": {"type": "plain_text", "text": "Or Upload a List"},
+                "optional": True,
+            },
+            {
+                "type": "context",
+                "elements": [
+                    {
+                        "type": "mrkdwn",
+                        "text": f"• Separate entries with spaces, commas or new lines\n• Up to {BATCH_MAX_ENTITIES} users and IPs are summarized per run",
+                    }
+                ],
+            },
+        ],
+        "submit": {"type": "plain_text", "text": "Investigate"},
+    }
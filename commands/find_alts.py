@@ -0,0 +1,59 @@
+from typing import Dict, Any
+
+
+def get_find_alts_modal_view() -> Dict[str, Any]:
+    find_alts_option = {
+        "text": {"type": "plain_text", "text": "👥 Find Alt Accounts"},
+        "value": "find_alts",
+    }
+    return {
+        "type": "modal",
+        "callback_id": "search_modal",
+        "title": {"type": "plain_text", "text": "👥 Find Alt Accounts"},
+        "blocks": [
+            {
+                "type": "input",
+                "block_id": "search_type",
+                "element": {
+                    "type": "static_select",
+                    "action_id": "type_selection",
+                    "options": [find_alts_option],
+                    "initial_option": find_alts_option,
+                },
+                "label": {"type": "plain_text", "text": "Search Type"},
+            },
+            {
+                "type": "input",
+                "block_id": "user_input",
+                "element": {
+                    "type": "plain_text_input",
+                    "action_id": "user_id_input",
+                    "placeholder": {"type": "plain_text", "text": "e.g., U12345ABC"},
+                },
+                "label": {"type": "plain_text", "text": "User ID"},
+            },
+            {
+                "type": "input",
+                "block_id": "confidence_threshold",
+                "element": {
+                    "type": "number_input",
+                    "is_decimal_allowed": True,
+                    "action_id": "confidence_input",
+                    "initial_value": "0.5",
+                    "min_value": "0",
+                    "max_value": "1",
+                },
+                "label": {"type": "plain_text", "text": "Confidence Threshold (0-1)"},
+            },
+            {
+                "type": "context",
+                "elements": [
+                    {
+                        "type": "mrkdwn",
+                        "text": "• Candidates are scored on shared IPs, weighted by how rare each IP is, how closely activity overlaps in time and how similar the user agents are",
+                    }
+                ],
+            },
+        ],
+        "submit": {"type": "plain_text", "text": "Search"},
+    }
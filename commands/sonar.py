@@ -53,6 +53,26 @@ async def handle_sonar(client: WebClient, ack: Ack, body: Dict[str, Any], contex
                         "value": "find_alts",
                         "action_id": "find_alts_action",
                     },
+                    {
+                        "type": "button",
+                        "text": {
+                            "type": "plain_text",
+                            "text": "📋 Batch Investigation",
+                            "emoji": True,
+                        },
+                        "value": "batch",
+                        "action_id": "batch_action",
+                    },
+                    {
+                        "type": "button",
+                        "text": {
+                            "type": "plain_text",
+                            "text": "👁️ Watchlists",
+                            "emoji": True,
+                        },
+                        "value": "watchlist",
+                        "action_id": "watchlist_action",
+                    },
                 ],
             },
             {"type": "divider"},
@@ -0,0 +1,89 @@
+from typing import Dict, Any, List
+from utils.watchlist import WATCH_KINDS
+from logs.alerts import escape
+
+MAX_LISTED = 30
+# Slack rejects section text over 3000 characters; leave room for the heading.
+MAX_LISTING_CHARS = 2900
+
+
+def describe_entries(entries: List[Dict[str, Any]]) -> str:
+    if not entries:
+        return "_The watchlist is empty._"
+    entries = sorted(entries, key=lambda entry: entry.get("added_at") or "", reverse=True)
+    lines: List[str] = []
+    length = 0
+    for entry in entries[:MAX_LISTED]:
+        value = f"<@{entry['value']}>" if entry["kind"] == "user_id" else f"`{entry['value']}`"
+        note = f" — {escape(entry['note'][:80])}" if entry.get("note") else ""
+        line = f"• {WATCH_KINDS.get(entry['kind'], entry['kind'])} {value}{note}"
+        # Keep room for the "…and N more" line.
+        if length + len(line) + 1 > MAX_LISTING_CHARS - 40:
+            break
+        lines.append(line)
+        length += len(line) + 1
+    if len(entries) > len(lines):
+        lines.append(f"…and {len(entries) - len(lines)} more")
+    return "\n".join(lines)
+
+
+def get_watchlist_modal_view(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    add_option = {"text": {"type": "plain_text", "text": "➕ Add to watchlist"}, "value": "add"}
+    return {
+        "type": "modal",
+        "callback_id": "watchlist_modal",
+        "title": {"type": "plain_text", "text": "👁️ Watchlists"},
+        "blocks": [
+            {
+                "type": "input",
+                "block_id": "watch_operation",
+                "element": {
+                    "type": "radio_buttons",
+                    "action_id": "operation",
+                    "options": [
+                        add_option,
+                        {"text": {"type": "plain_text", "text": "➖ Remove from watchlist"}, "value": "remove"},
+                    ],
+                    "initial_option": add_option,
+                },
+                "label": {"type": "plain_text", "text": "Action"},
+            },
+            {
+                "type": "input",
+                "block_id": "watch_entries",
+                "element": {
+                    "type": "plain_text_input",
+                    "action_id": "entries",
+                    "multiline": True,
+                    "placeholder": {"type": "plain_text", "text": "U12345ABC, 192.168.0.1, 10.0.0.0/8..."},
+                },
+                "label": {"type": "plain_text", "text": "User IDs, IPs and CIDR Ranges"},
+            },
+            {
+                "type": "input",
+                "block_id": "watch_note",
+                "element": {
+                    "type": "plain_text_input",
+                    "action_id": "note",
+                    "placeholder": {"type": "plain_text", "text": "e.g., Banned for raiding, appeal denied"},
+                },
+                "label": {"type": "plain_text", "text": "Note"},
+                "optional": True,
+            },
+            {"type": "divider"},
+            {
+                "type": "section",
+                "text": {"type": "mrkdwn", "text": f"*Currently watching ({len(entries)})*\n{describe_entries(entries)}"},
+            },
+            {
+                "type": "context",
+                "elements": [
+                    {
+                        "type": "mrkdwn",
+                        "text": "• New logins matching a watched user, IP or range are posted to the moderation channel",
+                    }
+                ],
+            },
+        ],
+        "submit": {"type": "plain_text", "text": "Save"},
+    }
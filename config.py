@@ -2,7 +2,7 @@ import os
 from dotenv import load_dotenv
 from elasticsearch import AsyncElasticsearch
 from slack_bolt.async_app import AsyncApp
-from slack_sdk.web.async_client import AsyncWebClient
+from utils.rate_limit import RateLimitedAsyncWebClient
 
 load_dotenv()
 
@@ -11,15 +11,71 @@ SLACK_USER_TOKEN = os.getenv("SLACK_USER_TOKEN")
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 SLACK_APP_TOKEN = os.getenv("SLACK_APP_TOKEN")
 SLACK_SIGNING_SECRET = os.getenv("SLACK_SIGNING_SECRET")
+SLACK_API_URL = os.getenv("SLACK_API_URL", "https://slack.com/api/")
 
 ES_HOST = os.getenv("ES_HOST")
 ES_PORT = int(os.getenv("ES_PORT"))
+ES_SCHEME = os.getenv("ES_SCHEME", "https")
 ES_INDEX = os.getenv("ES_INDEX")
+ES_READ_ALIAS = os.getenv("ES_READ_ALIAS", f"{ES_INDEX}-read")
+CHECKPOINT_INDEX = os.getenv("CHECKPOINT_INDEX", f"{ES_INDEX}-checkpoints")
+ROLLUP_INDEX = os.getenv("ROLLUP_INDEX", f"{ES_INDEX}-user-ip")
+ALT_MAX_IPS = int(os.getenv("ALT_MAX_IPS", "500"))
+ALT_MAX_IP_USERS = int(os.getenv("ALT_MAX_IP_USERS", "50"))
+WATCHLIST_INDEX = os.getenv("WATCHLIST_INDEX", f"{ES_INDEX}-watchlist")
+BATCH_MAX_ENTITIES = int(os.getenv("BATCH_MAX_ENTITIES", "200"))
+BATCH_MAX_CONCURRENT_SEARCHES = int(os.getenv("BATCH_MAX_CONCURRENT_SEARCHES", "8"))
 # Not used in PROD
 # ES_USER = os.getenv("ES_USER")
 # ES_PASS = os.getenv("ES_PASS")
 ES_API_KEY = os.getenv("ES_API_KEY")
 PORT = int(os.getenv("PORT"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+SEARCH_PIT_KEEP_ALIVE = os.getenv("SEARCH_PIT_KEEP_ALIVE", "10m")
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+SEARCH_CACHE_WATERMARK_INTERVAL = float(os.getenv("SEARCH_CACHE_WATERMARK_INTERVAL", "30"))
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "4"))
+SEARCH_DEADLINE = float(os.getenv("SEARCH_DEADLINE", "20"))
+SEARCH_MAX_QUEUED_PER_USER = int(os.getenv("SEARCH_MAX_QUEUED_PER_USER", "5"))
+SEARCH_SESSION_TTL = float(os.getenv("SEARCH_SESSION_TTL", "600"))
+SEARCH_SESSION_MAX = int(os.getenv("SEARCH_SESSION_MAX", "500"))
+CHANNEL_RECONCILE_INTERVAL = float(os.getenv("CHANNEL_RECONCILE_INTERVAL", "3600"))
+CHANNEL_LEAVE_CONCURRENCY = int(os.getenv("CHANNEL_LEAVE_CONCURRENCY", "10"))
+PROFILE_REFRESH_INTERVAL = float(os.getenv("PROFILE_REFRESH_INTERVAL", str(24 * 3600)))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_NEGATIVE_CACHE_TTL = float(os.getenv("AUTH_NEGATIVE_CACHE_TTL", "60"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_PROGRESS_INTERVAL = float(os.getenv("EXPORT_PROGRESS_INTERVAL", "5"))
+
+# Ingestion tuning
+INDEX_CHUNK_SIZE = int(os.getenv("INDEX_CHUNK_SIZE", "250"))
+INDEX_CONCURRENCY = int(os.getenv("INDEX_CONCURRENCY", "4"))
+INDEX_WORKERS = int(os.getenv("INDEX_WORKERS", "2"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+INCREMENTAL_POLL_INTERVAL = float(os.getenv("INCREMENTAL_POLL_INTERVAL", "300"))
+RECENT_IDS_SIZE = int(os.getenv("RECENT_IDS_SIZE", "20000"))
+BACKFILL_WINDOWS = int(os.getenv("BACKFILL_WINDOWS", "1"))
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "4"))
+DETECTOR_MAX_AGE = float(os.getenv("DETECTOR_MAX_AGE", "3600"))
+DETECTOR_STATE_SIZE = int(os.getenv("DETECTOR_STATE_SIZE", "100000"))
+DETECTOR_SHARED_IP_THRESHOLD = int(os.getenv("DETECTOR_SHARED_IP_THRESHOLD", "5"))
+DETECTOR_SHARED_IP_WINDOW = float(os.getenv("DETECTOR_SHARED_IP_WINDOW", "86400"))
+DETECTOR_UA_BURST = int(os.getenv("DETECTOR_UA_BURST", "3"))
+DETECTOR_UA_WINDOW = float(os.getenv("DETECTOR_UA_WINDOW", "3600"))
+WATCHLIST_REFRESH_INTERVAL = float(os.getenv("WATCHLIST_REFRESH_INTERVAL", "60"))
+WATCHLIST_MAX_AGE = float(os.getenv("WATCHLIST_MAX_AGE", "86400"))
+ALERT_DEDUP_TTL = float(os.getenv("ALERT_DEDUP_TTL", str(6 * 3600)))
+ALERTS_PER_MINUTE = int(os.getenv("ALERTS_PER_MINUTE", "10"))
+WATCHLIST_ALERTS_PER_MINUTE = int(os.getenv("WATCHLIST_ALERTS_PER_MINUTE", "60"))
+INDEX_MAINTENANCE_INTERVAL = float(os.getenv("INDEX_MAINTENANCE_INTERVAL", str(6 * 3600)))
+
+# Write-ahead spool for fetched pages awaiting Elasticsearch
+SPOOL_DIR = os.getenv("SPOOL_DIR", "spool")
+SPOOL_SEGMENT_BYTES = int(os.getenv("SPOOL_SEGMENT_BYTES", str(8 * 1024 * 1024)))
+SPOOL_MAX_BYTES = int(os.getenv("SPOOL_MAX_BYTES", str(1024 * 1024 * 1024)))
+SPOOL_ROLL_SECONDS = float(os.getenv("SPOOL_ROLL_SECONDS", "5"))
+SPOOL_FSYNC_INTERVAL = float(os.getenv("SPOOL_FSYNC_INTERVAL", "0.05"))
 
 # Development Elasticsearch connection
 # es_dev = AsyncElasticsearch(
@@ -42,7 +98,7 @@ es_prod = AsyncElasticsearch(
         {
             "host": ES_HOST,
             "port": ES_PORT,
-            "scheme": "https",
+            "scheme": ES_SCHEME,
         }
     ],
     api_key=ES_API_KEY,
@@ -53,5 +109,18 @@ es_prod = AsyncElasticsearch(
 # Use es_prod for production, es_dev for development
 es = es_prod
 
-app = AsyncApp(token=SLACK_BOT_TOKEN, signing_secret=SLACK_SIGNING_SECRET)
-user_client = AsyncWebClient(token=SLACK_USER_TOKEN)
\ No newline at end of file
+app = AsyncApp(
+    client=RateLimitedAsyncWebClient(token=SLACK_BOT_TOKEN, base_url=SLACK_API_URL),
+    signing_secret=SLACK_SIGNING_SECRET,
+)
+
+
+@app.middleware
+async def use_rate_limited_client(context, next):
+    # Bolt builds a plain AsyncWebClient for every request; hand listeners the
+    # shared rate-limited client instead so their calls draw from the same buckets.
+    context["client"] = app.client
+    await next()
+
+
+user_client = RateLimitedAsyncWebClient(token=SLACK_USER_TOKEN, base_url=SLACK_API_URL)
\ No newline at end of file
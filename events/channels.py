@@ -0,0 +1,18 @@
+from typing import Dict, Any
+from slack_bolt import BoltContext
+from utils.channel_guard import channel_guard
+
+
+async def handle_member_joined_channel(event: Dict[str, Any], context: BoltContext) -> None:
+    if event.get("user") != context.bot_user_id:
+        return
+    await channel_guard.on_joined({"id": event["channel"], "inviter": event.get("inviter")})
+
+
+async def handle_channel_joined(event: Dict[str, Any]) -> None:
+    await channel_guard.on_joined(event["channel"])
+
+
+async def handle_member_left_channel(event: Dict[str, Any], context: BoltContext) -> None:
+    if event.get("user") == context.bot_user_id:
+        channel_guard.on_left(event["channel"])
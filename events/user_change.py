@@ -0,0 +1,14 @@
+from typing import Dict, Any
+from utils.slack_utils import auth_cache
+from utils.profile_cache import profile_cache
+
+
+async def handle_user_change(event: Dict[str, Any]) -> None:
+    # Promotions, demotions and deactivations apply to cached authorization
+    # and rendered profiles as soon as Slack reports them.
+    auth_cache.update_from_profile(event["user"])
+    profile_cache.update(event["user"])
+
+
+async def handle_team_join(event: Dict[str, Any]) -> None:
+    profile_cache.update(event["user"])
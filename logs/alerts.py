@@ -0,0 +1,64 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Set
+from config import app, ALLOWED_CHANNEL_ID, ALERT_DEDUP_TTL, ALERTS_PER_MINUTE
+from utils.metrics import ALERTS
+
+
+def escape(value: object) -> str:
+    # Log fields are user-controlled; unescaped <, > and & would let a crafted
+    # user agent inject mentions or links into the alert.
+    return str(value).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+class AlertSink:
+    """Posts ingest-time alerts to the moderation channel.
+
+    An alert key is posted at most once per ALERT_DEDUP_TTL, and at most
+    ALERTS_PER_MINUTE alerts go out per minute; the rest are counted and
+    mentioned on the next alert that gets through. Posting happens in the
+    background so ingestion never waits on Slack.
+    """
+
+    def __init__(self, per_minute: int = ALERTS_PER_MINUTE, dedup_ttl: float = ALERT_DEDUP_TTL) -> None:
+        self.per_minute = per_minute
+        self.dedup_ttl = dedup_ttl
+        self.sent: "OrderedDict[str, float]" = OrderedDict()
+        self.posted: Deque[float] = deque()
+        self.suppressed = 0
+        self.tasks: Set[asyncio.Task] = set()
+
+    def raise_alert(self, rule: str, key: str, text: str) -> None:
+        now = time.monotonic()
+        while self.sent and now - next(iter(self.sent.values())) >= self.dedup_ttl:
+            self.sent.popitem(last=False)
+        if key in self.sent:
+            ALERTS.labels(rule, "duplicate").inc()
+            return
+        self.sent[key] = now
+
+        while self.posted and now - self.posted[0] >= 60:
+            self.posted.popleft()
+        if len(self.posted) >= self.per_minute:
+            self.suppressed += 1
+            ALERTS.labels(rule, "suppressed").inc()
+            return
+        self.posted.append(now)
+        if self.suppressed:
+            text += f"\n_{self.suppressed} more alerts were suppressed by rate limiting._"
+            self.suppressed = 0
+        ALERTS.labels(rule, "posted").inc()
+
+        task = asyncio.create_task(self.post(text))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def post(self, text: str) -> None:
+        try:
+            await app.client.chat_postMessage(channel=ALLOWED_CHANNEL_ID, text=text)
+        except Exception as e:
+            print(f"⚠️ Error posting alert: {e}")
+
+
+alert_sink = AlertSink()
@@ -0,0 +1,54 @@
+from config import es, CHECKPOINT_INDEX
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+CHECKPOINT_ID = "access_logs"
+
+
+async def create_checkpoint_index() -> None:
+    await es.options(ignore_status=[400]).indices.create(
+        index=CHECKPOINT_INDEX,
+        body={
+            "mappings": {
+                "dynamic": False,
+                "properties": {
+                    "backfill_cursor": {"type": "keyword", "index": False},
+                    "oldest_timestamp": {"type": "long"},
+                    "newest_timestamp": {"type": "long"},
+                    "backfill_complete": {"type": "boolean"},
+                },
+            }
+        },
+    )
+
+
+async def load_checkpoint(checkpoint_id: str = CHECKPOINT_ID) -> Dict[str, Any]:
+    try:
+        response = await es.options(ignore_status=[404]).get(
+            index=CHECKPOINT_INDEX, id=checkpoint_id
+        )
+        return response.get("_source", {}) if response.get("found") else {}
+    except Exception as e:
+        print(f"⚠️ Error loading checkpoint {checkpoint_id}: {e}")
+        return {}
+
+
+async def save_checkpoint(fields: Dict[str, Any], checkpoint_id: str = CHECKPOINT_ID) -> None:
+    # Partial upsert so the historical and incremental loops only ever touch
+    # their own fields of the shared document.
+    try:
+        await es.update(
+            index=CHECKPOINT_INDEX,
+            id=checkpoint_id,
+            doc=fields,
+            doc_as_upsert=True,
+            retry_on_conflict=3,
+        )
+    except Exception as e:
+        print(f"⚠️ Error saving checkpoint {checkpoint_id}: {e}")
+
+
+def to_datetime(timestamp: Optional[int]) -> Optional[datetime]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
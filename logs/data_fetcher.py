@@ -1,49 +1,223 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import asyncio
-from typing import Optional, List, Dict, Any
-from .index_logs import index_logs
+from functools import partial
+from typing import AsyncIterator, Optional, List, Dict, Any, Set
+from slack_sdk.errors import SlackApiError
+from config import (
+    INCREMENTAL_POLL_INTERVAL,
+    RECENT_IDS_SIZE,
+    BACKFILL_WINDOWS,
+    BACKFILL_WORKERS,
+    INDEX_MAINTENANCE_INTERVAL,
+)
+from utils.elastic_search import month_index, month_starts, ensure_month_index, force_merge
+from utils.metrics import record_indexed
+from .index_logs import index_logs, log_doc_id
 from .fetch_logs import fetch_logs
+from .checkpoints import load_checkpoint, save_checkpoint, to_datetime
+from .pipeline import Page, run_pipeline
+from .recent_ids import RecentIds
+from .spool import Spool
+from .rollup import ROLLUP_VERSION, rebuild_rollup
 
 TARGET_DATE: datetime = datetime(2023, 1, 1, hour=0, tzinfo=timezone.utc)
-earliestTimestamp: Optional[datetime] = None
+recent_ids = RecentIds(RECENT_IDS_SIZE)
+spool = Spool()
+# Newest date_last the incremental fetcher has spooled, so a finishing
+# windowed backfill never moves newest_timestamp back behind it.
+tailed_newest: Optional[int] = None
 
 
-async def fetch_historical_data() -> None:
-    global earliestTimestamp
-    cursor: Optional[str] = None
-    before: datetime = datetime.now(timezone.utc)
+async def historical_pages(checkpoint: Dict[str, Any]) -> AsyncIterator[Page]:
+    cursor: Optional[str] = checkpoint.get("backfill_cursor")
+    oldest: Optional[int] = checkpoint.get("oldest_timestamp")
+    newest_known: bool = checkpoint.get("newest_timestamp") is not None
+    if cursor or oldest:
+        print(f"⏩ Resuming historical backfill from {to_datetime(oldest)}.")
+
     while True:
         print("🔄 Fetching historical data...")
         logs: List[Dict[str, Any]]
-        logs, cursor = await fetch_logs(cursor=cursor)
-        if before <= TARGET_DATE:
+        try:
+            logs, cursor = await fetch_logs(cursor=cursor, before=None if cursor else to_datetime(oldest))
+        except SlackApiError as e:
+            if not cursor:
+                raise
+            # Cursors do not survive forever; fall back to the oldest timestamp reached.
+            print(f"⚠️ Stored cursor rejected ({e.response.get('error')}), resuming by timestamp.")
+            cursor = None
+            continue
+
+        fields: Dict[str, Any] = {}
+        if logs:
+            page_oldest = min(log["date_last"] for log in logs)
+            oldest = page_oldest if oldest is None else min(oldest, page_oldest)
+            fields = {"backfill_cursor": cursor, "oldest_timestamp": oldest}
+            if not newest_known:
+                newest_known = True
+                fields["newest_timestamp"] = max(log["date_last"] for log in logs)
+
+        if not logs or not cursor or to_datetime(oldest) <= TARGET_DATE:
             print("🛑 Target date reached or no more logs.")
-            break
-        elif logs:
-            await index_logs(logs)
-            before = min(
-                datetime.fromtimestamp(log["date_last"], tz=timezone.utc)
-                for log in logs
-            )
-            if earliestTimestamp is None:
-                earliestTimestamp = before
-        await asyncio.sleep(3)
+            fields.update({"backfill_cursor": None, "backfill_complete": True})
+            yield logs, fields
+            return
+        yield logs, fields
+
+
+async def window_pages(lower: int, upper: int, checkpoint: Dict[str, Any]) -> AsyncIterator[Page]:
+    # Windows page by timestamp rather than cursor so each one can start at its own upper bound.
+    # 'before' is inclusive, so logins sharing the boundary second come back on
+    # the next page and are dropped by document ID.
+    before: int = checkpoint.get("oldest_timestamp", upper)
+    boundary: Set[str] = set()
+    cursor: Optional[str] = None
+    while True:
+        logs, next_cursor = await fetch_logs(cursor=cursor, before=None if cursor else to_datetime(before))
+        fresh = [log for log in logs if log_doc_id(log) not in boundary]
+        in_window = [log for log in fresh if log["date_last"] >= lower]
+        page_oldest = min((log["date_last"] for log in logs), default=lower - 1)
+        if page_oldest < before:
+            before, cursor, boundary = page_oldest, None, set()
+        else:
+            # The whole page sits on one crowded second; follow the cursor through it.
+            cursor = next_cursor
+        boundary.update(log_doc_id(log) for log in logs if log["date_last"] == before)
+        if (not fresh and not cursor) or before < lower:
+            yield in_window, {"oldest_timestamp": lower, "backfill_complete": True}
+            return
+        yield in_window, {"oldest_timestamp": before}
+
+
+async def backfill_window(index: int, lower: int, upper: int, semaphore: asyncio.Semaphore) -> None:
+    checkpoint_id = f"backfill-window-{index}"
+    async with semaphore:
+        checkpoint = await load_checkpoint(checkpoint_id)
+        if checkpoint.get("backfill_complete"):
+            return
+        print(f"🔄 Backfilling window {index}: {to_datetime(lower)} to {to_datetime(upper)}")
+        await run_pipeline(
+            f"window {index}",
+            window_pages(lower, upper, checkpoint),
+            spool.append,
+            partial(spool.checkpoint, checkpoint_id=checkpoint_id),
+            workers=1,
+        )
+        print(f"✅ Window {index} complete.")
+
+
+async def fetch_windowed_historical_data(checkpoint: Dict[str, Any]) -> None:
+    windows: Optional[List[List[int]]] = checkpoint.get("backfill_windows")
+    if not windows:
+        # The plan is persisted so window checkpoints stay valid across restarts.
+        lower = int(TARGET_DATE.timestamp())
+        upper = int(datetime.now(timezone.utc).timestamp())
+        step = (upper - lower) // BACKFILL_WINDOWS + 1
+        windows = [[start, min(start + step, upper)] for start in range(lower, upper, step)]
+        # Only the plan is saved up front. newest_timestamp claims everything
+        # before it is indexed, so it goes through the spool once the windows
+        # are done.
+        await save_checkpoint({"backfill_windows": windows})
+
+    semaphore = asyncio.Semaphore(BACKFILL_WORKERS)
+    await asyncio.gather(
+        *(backfill_window(i, lower, upper, semaphore) for i, (lower, upper) in enumerate(windows))
+    )
+    newest = max(windows[-1][1], tailed_newest or 0)
+    await spool.checkpoint({"backfill_complete": True, "newest_timestamp": newest})
+
+
+async def fetch_historical_data() -> None:
+    checkpoint = await load_checkpoint()
+    if checkpoint.get("backfill_complete"):
+        print("✅ Historical backfill already complete.")
+        return
+    if BACKFILL_WINDOWS > 1 or checkpoint.get("backfill_windows"):
+        await fetch_windowed_historical_data(checkpoint)
+        return
+    # Checkpoints ride through the spool and only advance once the pages
+    # before them have been indexed.
+    await run_pipeline("historical", historical_pages(checkpoint), spool.append, spool.checkpoint)
+
+
+async def tail_logs(watermark: int) -> List[Dict[str, Any]]:
+    # Logins come back newest first, so page from now until the watermark is crossed.
+    fresh: List[Dict[str, Any]] = []
+    cursor: Optional[str] = None
+    while True:
+        logs, cursor = await fetch_logs(cursor=cursor)
+        fresh.extend(log for log in logs if log["date_last"] >= watermark)
+        if not logs or not cursor or min(log["date_last"] for log in logs) < watermark:
+            return fresh
 
 
 async def fetch_incremental_data() -> None:
-    global earliestTimestamp
+    global tailed_newest
+    newest: Optional[int] = None
     while True:
-        if earliestTimestamp is None:
-            await asyncio.sleep(300)
-            continue
-        print("🔄 Fetching incremental data...")
-        before: datetime = earliestTimestamp
-        logs: List[Dict[str, Any]]
-        logs, _ = await fetch_logs(before=before)
+        if newest is None:
+            checkpoint = await load_checkpoint()
+            newest = checkpoint.get("newest_timestamp")
+            if newest is None and checkpoint.get("backfill_windows"):
+                # A windowed backfill covers everything up to its plan's upper
+                # bound, so tailing can start there while the windows run.
+                newest = checkpoint["backfill_windows"][-1][1]
+            if newest is None:
+                await asyncio.sleep(INCREMENTAL_POLL_INTERVAL)
+                continue
+
+        print("🔄 Tailing new logins...")
+        logs = [log for log in await tail_logs(newest) if log_doc_id(log) not in recent_ids]
         if logs:
-            await index_logs(logs)
-            earliestTimestamp = max(
-                datetime.fromtimestamp(log["date_last"], tz=timezone.utc)
-                for log in logs
-            )
-        await asyncio.sleep(300)
+            await spool.append(logs)
+            recent_ids.add_all(log_doc_id(log) for log in logs)
+            newest = tailed_newest = max(newest, max(log["date_last"] for log in logs))
+            await spool.checkpoint({"newest_timestamp": newest})
+        await asyncio.sleep(INCREMENTAL_POLL_INTERVAL)
+
+
+async def maintain_indices() -> None:
+    while True:
+        now = datetime.now(timezone.utc)
+        # Roll over ahead of time so the first logins of a month never wait on index creation.
+        next_month = month_starts(now, now + timedelta(days=32))[-1]
+        await ensure_month_index(month_index(next_month))
+
+        checkpoint = await load_checkpoint()
+        if checkpoint.get("backfill_complete"):
+            # Months before last month no longer receive writes and can be merged down.
+            merged = set(checkpoint.get("merged_months") or [])
+            closed = month_starts(TARGET_DATE, now - timedelta(days=62))
+            for month in closed:
+                index = month_index(month)
+                if index in merged:
+                    continue
+                try:
+                    await force_merge(index)
+                except Exception as e:
+                    print(f"⚠️ Error force-merging {index}: {e}")
+                    break
+                merged.add(index)
+                await save_checkpoint({"merged_months": sorted(merged)})
+        await asyncio.sleep(INDEX_MAINTENANCE_INTERVAL)
+
+
+async def ensure_rollup() -> None:
+    checkpoint = await load_checkpoint()
+    if checkpoint.get("rollup_version") != ROLLUP_VERSION:
+        await rebuild_rollup()
+        await save_checkpoint({"rollup_version": ROLLUP_VERSION})
+
+
+async def seed_ingestion_metrics() -> None:
+    # newest_timestamp is only ever written through spool markers, in both
+    # backfill modes and by the tailer, so it never runs ahead of what is
+    # indexed and is a safe starting point for the lag gauge after a restart.
+    # With nothing indexed yet it is absent and the gauge starts unseeded.
+    newest = (await load_checkpoint()).get("newest_timestamp")
+    if newest:
+        record_indexed(newest)
+
+
+async def replay_spool() -> None:
+    await spool.replay(index_logs)
@@ -0,0 +1,132 @@
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Set
+from config import (
+    DETECTOR_MAX_AGE,
+    DETECTOR_STATE_SIZE,
+    DETECTOR_SHARED_IP_THRESHOLD,
+    DETECTOR_SHARED_IP_WINDOW,
+    DETECTOR_UA_BURST,
+    DETECTOR_UA_WINDOW,
+)
+from .alerts import alert_sink, escape
+
+MAX_COUNTRIES = 20
+MAX_USER_AGENTS = 20
+
+
+class UserState:
+    def __init__(self) -> None:
+        self.countries: Set[str] = set()
+        self.user_agents: "OrderedDict[str, None]" = OrderedDict()
+        # Only the last DETECTOR_UA_BURST sightings matter for the burst rule.
+        self.new_user_agents: Deque[int] = deque(maxlen=DETECTOR_UA_BURST)
+
+
+class Detectors:
+    """Incremental anomaly rules over newly indexed logins.
+
+    State is per user and per IP, each kept in an LRU capped at
+    DETECTOR_STATE_SIZE entries, so memory stays bounded however long the
+    fetcher runs. Logins older than DETECTOR_MAX_AGE (backfill) are ignored:
+    the rules describe what is happening now. A user's first sighting after a
+    restart only seeds their state.
+    """
+
+    def __init__(self, state_size: int = DETECTOR_STATE_SIZE) -> None:
+        self.state_size = state_size
+        self.users: "OrderedDict[str, UserState]" = OrderedDict()
+        self.ips: "OrderedDict[str, OrderedDict[str, int]]" = OrderedDict()
+
+    def user_state(self, user_id: str) -> UserState:
+        state = self.users.get(user_id)
+        if state is None:
+            state = self.users[user_id] = UserState()
+            if len(self.users) > self.state_size:
+                self.users.popitem(last=False)
+        else:
+            self.users.move_to_end(user_id)
+        return state
+
+    def ip_users(self, ip: str) -> "OrderedDict[str, int]":
+        users = self.ips.get(ip)
+        if users is None:
+            users = self.ips[ip] = OrderedDict()
+            if len(self.ips) > self.state_size:
+                self.ips.popitem(last=False)
+        else:
+            self.ips.move_to_end(ip)
+        return users
+
+    def observe(self, logs: List[Dict[str, Any]]) -> None:
+        cutoff = time.time() - DETECTOR_MAX_AGE
+        for log in sorted(logs, key=lambda log: log["date_last"]):
+            if log["date_last"] < cutoff:
+                continue
+            try:
+                state = self.user_state(log["user_id"])
+                self.check_country(log, state)
+                self.check_user_agents(log, state)
+                if log.get("ip"):
+                    self.check_shared_ip(log)
+            except Exception as e:
+                print(f"⚠️ Error running detectors on {log.get('user_id')}: {e}")
+
+    def check_country(self, log: Dict[str, Any], state: UserState) -> None:
+        country = log.get("country")
+        if not country or country in state.countries:
+            return
+        if state.countries:
+            previous = ", ".join(sorted(state.countries))
+            alert_sink.raise_alert(
+                "new_country",
+                f"new_country:{log['user_id']}:{country}",
+                f"🌍 <@{log['user_id']}> logged in from a new country: *{escape(country)}* "
+                f"(previously {escape(previous)}) via `{escape(log.get('ip'))}`.",
+            )
+        if len(state.countries) < MAX_COUNTRIES:
+            state.countries.add(country)
+
+    def check_user_agents(self, log: Dict[str, Any], state: UserState) -> None:
+        user_agent = log.get("user_agent")
+        if not user_agent:
+            return
+        if user_agent in state.user_agents:
+            state.user_agents.move_to_end(user_agent)
+            return
+        if state.user_agents:
+            timestamps = state.new_user_agents
+            timestamps.append(log["date_last"])
+            while timestamps and timestamps[0] <= log["date_last"] - DETECTOR_UA_WINDOW:
+                timestamps.popleft()
+            if len(timestamps) >= DETECTOR_UA_BURST:
+                alert_sink.raise_alert(
+                    "user_agent_burst",
+                    f"user_agent_burst:{log['user_id']}",
+                    f"🧪 <@{log['user_id']}> logged in with {len(timestamps)} new user agents within "
+                    f"{DETECTOR_UA_WINDOW / 60:.0f} minutes, latest `{escape(user_agent)}` from `{escape(log.get('ip'))}`.",
+                )
+        state.user_agents[user_agent] = None
+        if len(state.user_agents) > MAX_USER_AGENTS:
+            state.user_agents.popitem(last=False)
+
+    def check_shared_ip(self, log: Dict[str, Any]) -> None:
+        users = self.ip_users(log["ip"])
+        users[log["user_id"]] = log["date_last"]
+        users.move_to_end(log["user_id"])
+        # Least recently seen first, so expired users are dropped from the front.
+        while users and next(iter(users.values())) <= log["date_last"] - DETECTOR_SHARED_IP_WINDOW:
+            users.popitem(last=False)
+        while len(users) > DETECTOR_SHARED_IP_THRESHOLD * 4:
+            users.popitem(last=False)
+        if len(users) > DETECTOR_SHARED_IP_THRESHOLD:
+            mentions = " ".join(f"<@{user_id}>" for user_id in list(users)[-10:])
+            alert_sink.raise_alert(
+                "shared_ip",
+                f"shared_ip:{log['ip']}",
+                f"🕸️ IP `{escape(log['ip'])}` was used by {len(users)} accounts within "
+                f"{DETECTOR_SHARED_IP_WINDOW / 3600:.0f} hours: {mentions}",
+            )
+
+
+detectors = Detectors()
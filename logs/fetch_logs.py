@@ -1,4 +1,5 @@
 from config import user_client
+from utils.metrics import PAGES_FETCHED
 
 async def fetch_logs(cursor=None, limit=500, before=None):
     params = {"limit": limit}
@@ -8,5 +9,6 @@ async def fetch_logs(cursor=None, limit=500, before=None):
         params["before"] = int(before.timestamp())
     
     response = await user_client.team_accessLogs(**params)
-    
+    PAGES_FETCHED.inc()
+
     return response.get("logins", []), response.get("response_metadata", {}).get("next_cursor")
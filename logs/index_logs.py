@@ -1,37 +1,166 @@
-from config import es, ES_INDEX
+import asyncio
+import time
+from config import es, INDEX_CHUNK_SIZE, INDEX_CONCURRENCY
 from datetime import datetime, timezone
+from typing import List, Dict, Any, Set, Tuple
+from elasticsearch.helpers import async_bulk
+from utils.elastic_search import month_index, ensure_month_index, outdated_indices
+from utils.metrics import BULK_LATENCY, DOCUMENTS, record_indexed
+from .rollup import rollup_logs
+from .detectors import detectors
+from .watchlist import watchlist
 
 
-async def index_logs(logs):
+def log_doc_id(log: Dict[str, Any]) -> str:
+    return f"{log['user_id']}_{log['date_last']}"
+
+
+def build_action(log: Dict[str, Any]) -> Dict[str, Any]:
+    ip_address = log.get("ip") or None
+    date_last = datetime.fromtimestamp(log["date_last"], tz=timezone.utc)
+    # Documents live in the month of their last login, so create-if-absent
+    # deduplication holds no matter which loop fetched them.
+    return {
+        "_op_type": "create",
+        "_index": month_index(date_last),
+        "_id": log_doc_id(log),
+        "_source": {
+            "user_id": log["user_id"],
+            "username": log["username"],
+            "date_first": datetime.fromtimestamp(log["date_first"], tz=timezone.utc),
+            "date_last": date_last,
+            "count": log["count"],
+            "ip": ip_address,
+            "user_agent": log["user_agent"],
+            "isp": log["isp"],
+            "country": log["country"],
+            "region": log["region"],
+        },
+    }
+
+
+class OutdatedIds:
+    """Create-if-absent only deduplicates within one index. Until the older
+    indices are migrated, logins they already hold are looked up by ID so a
+    re-fetched page is not indexed (and rolled up) a second time."""
+
+    def __init__(self, refresh_interval: float = 300) -> None:
+        self.refresh_interval = refresh_interval
+        self.indices: List[str] = []
+        self.checked = float("-inf")
+
+    async def existing(self, doc_ids: List[str], chunk_size: int = INDEX_CHUNK_SIZE) -> Set[str]:
+        if time.monotonic() - self.checked >= self.refresh_interval:
+            self.indices = await outdated_indices()
+            self.checked = time.monotonic()
+        if not self.indices or not doc_ids:
+            return set()
+        responses = await asyncio.gather(*(
+            es.search(
+                index=",".join(self.indices),
+                ignore_unavailable=True,
+                body={"query": {"ids": {"values": chunk}}, "size": len(chunk), "_source": False},
+            )
+            for chunk in (doc_ids[i:i + chunk_size] for i in range(0, len(doc_ids), chunk_size))
+        ))
+        return {hit["_id"] for response in responses for hit in response["hits"]["hits"]}
+
+
+outdated_ids = OutdatedIds()
+
+
+def empty_stats() -> Dict[str, int]:
+    # "retryable" counts documents rejected because ES was unreachable or
+    # overloaded, as opposed to "failed" documents that will never index.
+    return {"created": 0, "duplicates": 0, "failed": 0, "retryable": 0}
+
+
+async def bulk_chunk(
+    actions: List[Dict[str, Any]], semaphore: asyncio.Semaphore
+) -> Tuple[Dict[str, int], Set[str]]:
+    stats = empty_stats()
+    async with semaphore:
+        try:
+            with BULK_LATENCY.time():
+                success, errors = await async_bulk(
+                    es,
+                    actions,
+                    chunk_size=len(actions),
+                    raise_on_error=False,
+                    raise_on_exception=False,
+                )
+        except Exception as e:
+            print(f"⚠️ Error bulk indexing chunk: {e}")
+            stats["retryable"] = len(actions)
+            return stats, set()
+
+    stats["created"] = success
+    created_ids = {action["_id"] for action in actions}
+    for error in errors:
+        created_ids.discard(error.get("create", {}).get("_id"))
+        status = error.get("create", {}).get("status")
+        if status == 409:
+            stats["duplicates"] += 1
+        elif status == 429 or (isinstance(status, int) and status >= 500):
+            stats["retryable"] += 1
+        else:
+            stats["failed"] += 1
+    return stats, created_ids
+
+
+async def index_logs(
+    logs: List[Dict[str, Any]],
+    chunk_size: int = INDEX_CHUNK_SIZE,
+    concurrency: int = INDEX_CONCURRENCY,
+) -> Dict[str, int]:
+    stats = empty_stats()
+    actions = []
+    logs_by_id: Dict[str, Dict[str, Any]] = {}
+    for log in logs:
+        try:
+            actions.append(build_action(log))
+            logs_by_id[actions[-1]["_id"]] = log
+        except Exception as e:
+            print(f"⚠️ Skipping malformed log record: {e}")
+            stats["failed"] += 1
+
     try:
-        for log in logs:
-            doc_id = f"{log['user_id']}_{log['date_last']}"
-            if not await es.exists(index=ES_INDEX, id=doc_id):
-                ip_address = log.get("ip") or None
-                action = {
-                    "_op_type": "index",
-                    "_index": ES_INDEX,
-                    "_id": doc_id,
-                    "_source": {
-                        "user_id": log["user_id"],
-                        "username": log["username"],
-                        "date_first": datetime.fromtimestamp(
-                            log["date_first"], tz=timezone.utc
-                        ),
-                        "date_last": datetime.fromtimestamp(
-                            log["date_last"], tz=timezone.utc
-                        ),
-                        "count": log["count"],
-                        "ip": ip_address,
-                        "user_agent": log["user_agent"],
-                        "isp": log["isp"],
-                        "country": log["country"],
-                        "region": log["region"],
-                    },
-                }
-                await es.index(index=ES_INDEX, id=doc_id, document=action["_source"])
-                print(f"📥 Indexed document {doc_id}.")
-            else:
-                print(f"📜 Document {doc_id} already exists. Skipping.")
+        existing = await outdated_ids.existing([action["_id"] for action in actions])
     except Exception as e:
-        print(f"⚠️ Error indexing logs: {e}")
+        print(f"⚠️ Error checking older indices for duplicates: {e}")
+        stats["retryable"] += len(actions)
+        return stats
+    if existing:
+        stats["duplicates"] += len(existing)
+        actions = [action for action in actions if action["_id"] not in existing]
+
+    for index in {action["_index"] for action in actions}:
+        await ensure_month_index(index)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    chunks = [actions[i:i + chunk_size] for i in range(0, len(actions), chunk_size)]
+    results = await asyncio.gather(*(bulk_chunk(chunk, semaphore) for chunk in chunks))
+    created_ids: Set[str] = set()
+    for result, chunk_created_ids in results:
+        for key, value in result.items():
+            stats[key] += value
+        created_ids |= chunk_created_ids
+    for key, value in stats.items():
+        DOCUMENTS.labels(key).inc(value)
+    if logs and not stats["retryable"]:
+        record_indexed(max(log["date_last"] for log in logs))
+
+    # Only newly created documents feed the rollup and detectors, so replays
+    # never double count or re-alert.
+    if created_ids:
+        created_logs = [logs_by_id[doc_id] for doc_id in created_ids]
+        await rollup_logs(created_logs)
+        detectors.observe(created_logs)
+        watchlist.check(created_logs)
+
+    print(
+        f"📥 Indexed batch: {stats['created']} created, "
+        f"{stats['duplicates']} duplicates, {stats['failed']} failed, "
+        f"{stats['retryable']} retryable."
+    )
+    return stats
@@ -0,0 +1,101 @@
+import asyncio
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, List, Optional, Tuple
+from config import INDEX_WORKERS, PIPELINE_QUEUE_SIZE
+from utils.metrics import QUEUE_DEPTH
+
+Page = Tuple[List[Dict[str, Any]], Dict[str, Any]]
+
+
+class StageStats:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.pages = 0
+        self.docs = 0
+        self.busy = 0.0
+        self.started = time.monotonic()
+
+    def record(self, docs: int, elapsed: float) -> None:
+        self.pages += 1
+        self.docs += docs
+        self.busy += elapsed
+
+    def summary(self, workers: int = 1) -> str:
+        wall = max(time.monotonic() - self.started, 1e-6)
+        return (
+            f"{self.name}: {self.pages} pages, {self.docs} docs, "
+            f"{self.docs / wall:.1f} docs/s, {self.busy / (wall * workers):.0%} busy"
+        )
+
+
+class CheckpointTracker:
+    """Commits checkpoint fields only once every earlier page has been indexed."""
+
+    def __init__(self, save: Callable[[Dict[str, Any]], Awaitable[None]]) -> None:
+        self.save = save
+        self.next_seq = 0
+        self.completed: Dict[int, Dict[str, Any]] = {}
+
+    async def complete(self, seq: int, fields: Dict[str, Any]) -> None:
+        self.completed[seq] = fields
+        merged: Dict[str, Any] = {}
+        while self.next_seq in self.completed:
+            merged.update(self.completed.pop(self.next_seq))
+            self.next_seq += 1
+        if merged:
+            await self.save(merged)
+
+
+async def run_pipeline(
+    name: str,
+    pages: AsyncIterator[Page],
+    sink: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+    save: Callable[[Dict[str, Any]], Awaitable[None]],
+    workers: int = INDEX_WORKERS,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    report_interval: float = 60,
+) -> None:
+    queue: asyncio.Queue[Optional[Tuple[int, Page]]] = asyncio.Queue(maxsize=queue_size)
+    fetch_stats = StageStats(f"{name} fetch")
+    sink_stats = StageStats(f"{name} sink")
+    tracker = CheckpointTracker(save)
+    QUEUE_DEPTH.labels(name).set_function(queue.qsize)
+
+    async def producer() -> None:
+        seq = 0
+        started = time.monotonic()
+        async for logs, fields in pages:
+            fetch_stats.record(len(logs), time.monotonic() - started)
+            # Blocks once the queue is full, so a slow sink throttles fetching.
+            await queue.put((seq, (logs, fields)))
+            seq += 1
+            started = time.monotonic()
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def consumer() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            seq, (logs, fields) = item
+            started = time.monotonic()
+            if logs:
+                await sink(logs)
+            sink_stats.record(len(logs), time.monotonic() - started)
+            await tracker.complete(seq, fields)
+
+    async def reporter() -> None:
+        while True:
+            await asyncio.sleep(report_interval)
+            print(
+                f"📊 {fetch_stats.summary()} | {sink_stats.summary(workers)} | "
+                f"queue {queue.qsize()}/{queue_size}"
+            )
+
+    report_task = asyncio.create_task(reporter())
+    try:
+        await asyncio.gather(producer(), *(consumer() for _ in range(workers)))
+    finally:
+        report_task.cancel()
+    print(f"📊 {fetch_stats.summary()} | {sink_stats.summary(workers)}")
@@ -0,0 +1,20 @@
+from collections import OrderedDict
+from typing import Iterable
+
+
+class RecentIds:
+    """Bounded insertion-ordered set of recently indexed document IDs."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.ids: "OrderedDict[str, None]" = OrderedDict()
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.ids
+
+    def add_all(self, doc_ids: Iterable[str]) -> None:
+        for doc_id in doc_ids:
+            self.ids[doc_id] = None
+            self.ids.move_to_end(doc_id)
+        while len(self.ids) > self.max_size:
+            self.ids.popitem(last=False)
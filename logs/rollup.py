@@ -0,0 +1,211 @@
+import hashlib
+from config import es, ES_READ_ALIAS, ROLLUP_INDEX, INDEX_CHUNK_SIZE
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+from elasticsearch.helpers import async_bulk
+
+# Bump when the rollup documents change shape; ensure_rollup rebuilds them.
+ROLLUP_VERSION = 2
+
+# Merges a batch summary into an existing (user_id, ip) document. ISO-8601 UTC
+# strings from to_iso compare correctly as strings.
+#
+# Slack reports one cumulative count per (user, ip, user_agent) session, and
+# every later snapshot of it is a new log document. The pair keeps the latest
+# count of each session (keyed by session_key) and its total is their sum, so
+# re-reported sessions are never added twice.
+ROLLUP_SCRIPT = """
+def s = ctx._source;
+if (s.first_seen == null || params.first_seen.compareTo(s.first_seen) < 0) {
+    s.first_seen = params.first_seen;
+}
+if (s.last_seen == null || params.last_seen.compareTo(s.last_seen) > 0) {
+    s.last_seen = params.last_seen;
+    s.username = params.username;
+    s.user_agent = params.user_agent;
+    s.country = params.country;
+    s.region = params.region;
+    s.isp = params.isp;
+}
+if (s.counts == null) {
+    s.counts = [:];
+}
+for (def entry : params.counts.entrySet()) {
+    def previous = s.counts[entry.getKey()];
+    if (previous == null || entry.getValue() > previous) {
+        s.counts[entry.getKey()] = entry.getValue();
+    }
+}
+long total = 0;
+for (def count : s.counts.values()) {
+    total += count;
+}
+s.count = total;
+"""
+
+
+def to_iso(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def rollup_doc_id(user_id: str, ip: str) -> str:
+    return f"{user_id}_{ip}"
+
+
+def session_key(user_agent: Optional[str], date_first: int) -> str:
+    # The pair's user and IP are already in the document ID.
+    return hashlib.sha1(f"{date_first}|{user_agent or ''}".encode()).hexdigest()[:16]
+
+
+def summarize(logs: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    pairs: Dict[str, Dict[str, Any]] = {}
+    for log in logs:
+        ip = log.get("ip")
+        if not ip:
+            continue
+        pair_id = rollup_doc_id(log["user_id"], ip)
+        pair = pairs.get(pair_id)
+        if pair is None:
+            pairs[pair_id] = pair = {
+                "user_id": log["user_id"],
+                "ip": ip,
+                "first_seen": log["date_first"],
+                "last_seen": log["date_last"],
+                "counts": {},
+            }
+        pair["first_seen"] = min(pair["first_seen"], log["date_first"])
+        key = session_key(log.get("user_agent"), log["date_first"])
+        pair["counts"][key] = max(pair["counts"].get(key, 0), log["count"])
+        if log["date_last"] >= pair["last_seen"]:
+            pair["last_seen"] = log["date_last"]
+            for field in ("username", "user_agent", "country", "region", "isp"):
+                pair[field] = log.get(field)
+    for pair in pairs.values():
+        pair["first_seen"] = to_iso(pair["first_seen"])
+        pair["last_seen"] = to_iso(pair["last_seen"])
+        pair["count"] = sum(pair["counts"].values())
+    return pairs
+
+
+async def rollup_logs(logs: List[Dict[str, Any]]) -> None:
+    actions = [
+        {
+            "_op_type": "update",
+            "_index": ROLLUP_INDEX,
+            "_id": pair_id,
+            "retry_on_conflict": 5,
+            "script": {"source": ROLLUP_SCRIPT, "lang": "painless", "params": pair},
+            "upsert": pair,
+        }
+        for pair_id, pair in summarize(logs).items()
+    ]
+    if not actions:
+        return
+    try:
+        _, errors = await async_bulk(
+            es, actions, chunk_size=INDEX_CHUNK_SIZE, raise_on_error=False, raise_on_exception=False
+        )
+        if errors:
+            print(f"⚠️ {len(errors)} user/IP rollup updates failed.")
+    except Exception as e:
+        print(f"⚠️ Error updating user/IP rollup: {e}")
+
+
+def rebuilt_pair(key: Tuple[str, str], sessions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latest = max(sessions, key=lambda session: session["last_seen"])
+    counts = {session["key"]: session["count"] for session in sessions}
+    return {
+        "_op_type": "index",
+        "_index": ROLLUP_INDEX,
+        "_id": rollup_doc_id(*key),
+        "_source": {
+            "user_id": key[0],
+            "ip": key[1],
+            **latest["fields"],
+            "first_seen": to_iso(min(session["first_seen"] for session in sessions)),
+            "last_seen": to_iso(latest["last_seen"]),
+            "counts": counts,
+            "count": sum(counts.values()),
+        },
+    }
+
+
+async def write_rebuilt(actions: List[Dict[str, Any]]) -> None:
+    _, errors = await async_bulk(
+        es, actions, chunk_size=INDEX_CHUNK_SIZE, raise_on_error=False, raise_on_exception=False
+    )
+    if errors:
+        print(f"⚠️ {len(errors)} user/IP rollup documents failed to rebuild.")
+
+
+async def rebuild_rollup(batch_size: int = 1000) -> None:
+    # Recomputes every (user_id, ip) pair from the raw index; used to seed the
+    # rollup for data indexed before it existed, or after ROLLUP_VERSION changes.
+    # Buckets are per session, sorted by pair, so a pair's sessions arrive
+    # together and may only straddle a batch boundary.
+    after: Optional[Dict[str, Any]] = None
+    current: Optional[Tuple[str, str]] = None
+    sessions: List[Dict[str, Any]] = []
+    rebuilt = 0
+    while True:
+        composite: Dict[str, Any] = {
+            "size": batch_size,
+            "sources": [
+                {"user_id": {"terms": {"field": "user_id"}}},
+                {"ip": {"terms": {"field": "ip"}}},
+                {"user_agent": {"terms": {"field": "user_agent.keyword", "missing_bucket": True}}},
+                {"date_first": {"terms": {"field": "date_first"}}},
+            ],
+        }
+        if after:
+            composite["after"] = after
+        response = await es.search(
+            index=ES_READ_ALIAS,
+            body={
+                "size": 0,
+                "aggs": {
+                    "sessions": {
+                        "composite": composite,
+                        "aggs": {
+                            "last_seen": {"max": {"field": "date_last"}},
+                            "count": {"max": {"field": "count"}},
+                            "latest": {
+                                "top_hits": {
+                                    "size": 1,
+                                    "_source": ["username", "user_agent", "country", "region", "isp"],
+                                    "sort": [{"date_last": "desc"}],
+                                }
+                            },
+                        },
+                    }
+                },
+            },
+        )
+        buckets = response["aggregations"]["sessions"]
+        actions = []
+        for bucket in buckets["buckets"]:
+            key = (bucket["key"]["user_id"], bucket["key"]["ip"])
+            if key != current:
+                if sessions:
+                    actions.append(rebuilt_pair(current, sessions))
+                current, sessions = key, []
+            fields = bucket["latest"]["hits"]["hits"][0]["_source"]
+            date_first = int(bucket["key"]["date_first"] / 1000)
+            sessions.append({
+                # User agents too long for the keyword field fall back to the hit's.
+                "key": session_key(bucket["key"]["user_agent"] or fields.get("user_agent"), date_first),
+                "first_seen": date_first,
+                "last_seen": int(bucket["last_seen"]["value"] / 1000),
+                "count": int(bucket["count"]["value"] or 0),
+                "fields": fields,
+            })
+        if actions:
+            await write_rebuilt(actions)
+            rebuilt += len(actions)
+        after = buckets.get("after_key")
+        if not after or len(buckets["buckets"]) < batch_size:
+            break
+    if sessions:
+        await write_rebuilt([rebuilt_pair(current, sessions)])
+        rebuilt += 1
+    print(f"🧮 Rebuilt user/IP rollup: {rebuilt} pairs.")
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from config import (
+    SPOOL_DIR,
+    SPOOL_SEGMENT_BYTES,
+    SPOOL_MAX_BYTES,
+    SPOOL_ROLL_SECONDS,
+    SPOOL_FSYNC_INTERVAL,
+    INDEX_WORKERS,
+)
+from utils.metrics import SPOOL_SEGMENTS
+from .checkpoints import CHECKPOINT_ID, save_checkpoint
+from .pipeline import StageStats
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+
+
+class Spool:
+    """Append-only, segmented JSONL write-ahead log of fetched access logs.
+
+    Pages are appended (with batched fsyncs) before anything is sent to ES, and
+    a replayer drains sealed segments into ES, deleting each segment only once
+    every record in it has been indexed or rejected for good.
+
+    Checkpoint updates are spooled as marker records behind the pages they
+    cover and saved only once their segment and every earlier one have been
+    indexed, so losing the spool directory never leaves a checkpoint pointing
+    past logins that were not indexed.
+    """
+
+    def __init__(self, directory: str = SPOOL_DIR) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock = asyncio.Lock()
+        self.sealed: List[str] = sorted(
+            name for name in os.listdir(directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+        self.next_seq = max((self.segment_seq(name) for name in self.sealed), default=-1) + 1
+        self.active: Optional[Any] = None
+        self.active_name: Optional[str] = None
+        self.active_bytes = 0
+        self.active_opened = 0.0
+        self.pending_sync: Optional[asyncio.Future] = None
+        self.space_freed = asyncio.Event()
+        # Replayed segments whose checkpoint markers wait on an earlier segment.
+        self.replayed: Dict[str, List[Dict[str, Any]]] = {}
+        self.commit_lock = asyncio.Lock()
+        SPOOL_SEGMENTS.set_function(lambda: len(self.sealed))
+
+    @staticmethod
+    def segment_seq(name: str) -> int:
+        return int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def size(self) -> int:
+        sealed = sum(os.path.getsize(self.path(name)) for name in self.sealed)
+        return sealed + self.active_bytes
+
+    def open_segment(self) -> None:
+        self.active_name = f"{SEGMENT_PREFIX}{self.next_seq:010d}{SEGMENT_SUFFIX}"
+        self.next_seq += 1
+        self.active = open(self.path(self.active_name), "ab")
+        self.active_bytes = 0
+        self.active_opened = time.monotonic()
+
+    async def seal(self) -> None:
+        if self.active is None:
+            return
+        self.active.flush()
+        await asyncio.to_thread(os.fsync, self.active.fileno())
+        self.active.close()
+        self.sealed.append(self.active_name)
+        self.active = None
+        self.active_name = None
+        self.active_bytes = 0
+
+    async def append(self, logs: List[Dict[str, Any]]) -> None:
+        if not logs:
+            return
+        data = "".join(json.dumps(log, separators=(",", ":")) + "\n" for log in logs).encode()
+        while self.size() + len(data) > SPOOL_MAX_BYTES and self.sealed:
+            print("⏸️ Spool is full, waiting for the replayer to catch up...")
+            self.space_freed.clear()
+            await self.space_freed.wait()
+        await self.write(data)
+
+    async def checkpoint(self, fields: Dict[str, Any], checkpoint_id: str = CHECKPOINT_ID) -> None:
+        marker = {"checkpoint": {"id": checkpoint_id, "fields": fields}}
+        await self.write((json.dumps(marker, separators=(",", ":")) + "\n").encode())
+
+    async def write(self, data: bytes) -> None:
+        async with self.lock:
+            if self.active is None:
+                self.open_segment()
+            self.active.write(data)
+            self.active_bytes += len(data)
+            if self.active_bytes >= SPOOL_SEGMENT_BYTES:
+                await self.seal()
+                return
+        await self.sync()
+
+    async def sync(self) -> None:
+        # Group commit: appends landing within one interval share a single fsync.
+        if self.pending_sync is None:
+            self.pending_sync = asyncio.ensure_future(self.flush_after_delay())
+        await asyncio.shield(self.pending_sync)
+
+    async def flush_after_delay(self) -> None:
+        await asyncio.sleep(SPOOL_FSYNC_INTERVAL)
+        self.pending_sync = None
+        async with self.lock:
+            if self.active is not None:
+                self.active.flush()
+                await asyncio.to_thread(os.fsync, self.active.fileno())
+
+    async def seal_if_due(self) -> None:
+        async with self.lock:
+            if self.active is not None and time.monotonic() - self.active_opened >= SPOOL_ROLL_SECONDS:
+                await self.seal()
+
+    def read_segment(self, name: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        logs, checkpoints = [], []
+        with open(self.path(name), "rb") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write; everything before it is intact.
+                    print(f"⚠️ Skipping corrupt record in spool segment {name}.")
+                    continue
+                if "checkpoint" in record:
+                    checkpoints.append(record["checkpoint"])
+                else:
+                    logs.append(record)
+        return logs, checkpoints
+
+    async def commit_checkpoints(self) -> None:
+        # Segments replay out of order; a checkpoint only lands once nothing
+        # older is still waiting in the spool.
+        async with self.commit_lock:
+            merged: Dict[str, Dict[str, Any]] = {}
+            for name in sorted(self.replayed):
+                if self.sealed and self.sealed[0] < name:
+                    break
+                for checkpoint in self.replayed.pop(name):
+                    merged.setdefault(checkpoint["id"], {}).update(checkpoint["fields"])
+            for checkpoint_id, fields in merged.items():
+                await save_checkpoint(fields, checkpoint_id)
+
+    async def replay_segment(
+        self,
+        name: str,
+        index: Callable[[List[Dict[str, Any]]], Awaitable[Dict[str, int]]],
+        stats: StageStats,
+    ) -> bool:
+        started = time.monotonic()
+        logs, checkpoints = self.read_segment(name)
+        result = await index(logs) if logs else {"retryable": 0}
+        if result["retryable"]:
+            return False
+        stats.record(len(logs), time.monotonic() - started)
+        os.remove(self.path(name))
+        self.sealed.remove(name)
+        self.replayed[name] = checkpoints
+        self.space_freed.set()
+        await self.commit_checkpoints()
+        return True
+
+    async def replay(
+        self,
+        index: Callable[[List[Dict[str, Any]]], Awaitable[Dict[str, int]]],
+        workers: int = INDEX_WORKERS,
+        report_interval: float = 60,
+    ) -> None:
+        stats = StageStats("spool replay")
+        in_flight: Dict[str, asyncio.Task] = {}
+        backoff = 1.0
+        last_report = time.monotonic()
+        while True:
+            await self.seal_if_due()
+            for name in list(self.sealed):
+                if len(in_flight) >= workers:
+                    break
+                if name not in in_flight:
+                    in_flight[name] = asyncio.create_task(self.replay_segment(name, index, stats))
+
+            if not in_flight:
+                await asyncio.sleep(1)
+                continue
+
+            done, _ = await asyncio.wait(in_flight.values(), return_when=asyncio.FIRST_COMPLETED)
+            for name, task in list(in_flight.items()):
+                if task not in done:
+                    continue
+                del in_flight[name]
+                try:
+                    ok = task.result()
+                except Exception as e:
+                    print(f"⚠️ Error replaying spool segment {name}: {e}")
+                    ok = False
+                if ok:
+                    backoff = 1.0
+                else:
+                    print(f"⏳ Elasticsearch unavailable, retrying spool in {backoff:.0f}s.")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 300)
+
+            if time.monotonic() - last_report >= report_interval:
+                last_report = time.monotonic()
+                print(f"📊 {stats.summary(workers)} | {len(self.sealed)} segments pending")
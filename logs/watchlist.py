@@ -0,0 +1,111 @@
+import asyncio
+import bisect
+import ipaddress
+import time
+from typing import Any, Dict, List, Tuple
+from config import WATCHLIST_REFRESH_INTERVAL, WATCHLIST_MAX_AGE, WATCHLIST_ALERTS_PER_MINUTE
+from utils.watchlist import load_watch_entries
+from .alerts import AlertSink, escape
+
+# One merged, disjoint address interval and the CIDR entries it came from.
+Interval = Tuple[int, int, List[Dict[str, Any]]]
+
+
+def build_intervals(entries: List[Dict[str, Any]]) -> Tuple[List[int], List[Interval]]:
+    ranges = []
+    for entry in entries:
+        network = ipaddress.ip_network(entry["value"])
+        ranges.append((int(network.network_address), int(network.broadcast_address), entry))
+    ranges.sort(key=lambda item: item[0])
+
+    # Overlapping ranges are merged so a single bisect finds the only interval
+    # that can contain an address; its few source entries are then checked.
+    intervals: List[Interval] = []
+    for start, end, entry in ranges:
+        if intervals and start <= intervals[-1][1]:
+            last_start, last_end, sources = intervals[-1]
+            sources.append(entry)
+            intervals[-1] = (last_start, max(last_end, end), sources)
+        else:
+            intervals.append((start, end, [entry]))
+    return [interval[0] for interval in intervals], intervals
+
+
+class Watchlist:
+    """In-memory matcher over the persisted watchlist: hash lookups for user
+    IDs and IPs, and a bisect over sorted CIDR intervals per IP version."""
+
+    def __init__(self) -> None:
+        self.user_ids: Dict[str, Dict[str, Any]] = {}
+        self.ips: Dict[str, Dict[str, Any]] = {}
+        self.ranges: Dict[int, Tuple[List[int], List[Interval]]] = {}
+        # Matches are explicitly requested, so they get their own, looser rate
+        # limit instead of competing with the anomaly detectors.
+        self.alerts = AlertSink(per_minute=WATCHLIST_ALERTS_PER_MINUTE)
+
+    def load(self, entries: List[Dict[str, Any]]) -> None:
+        cidrs: Dict[int, List[Dict[str, Any]]] = {4: [], 6: []}
+        user_ids, ips = {}, {}
+        for entry in entries:
+            if entry["kind"] == "user_id":
+                user_ids[entry["value"]] = entry
+            elif entry["kind"] == "ip":
+                ips[entry["value"]] = entry
+            elif entry["kind"] == "cidr":
+                cidrs[ipaddress.ip_network(entry["value"]).version].append(entry)
+        self.user_ids, self.ips = user_ids, ips
+        self.ranges = {version: build_intervals(networks) for version, networks in cidrs.items()}
+
+    def match_cidr(self, address: Any) -> List[Dict[str, Any]]:
+        starts, intervals = self.ranges.get(address.version, ([], []))
+        position = bisect.bisect_right(starts, int(address)) - 1
+        if position < 0 or int(address) > intervals[position][1]:
+            return []
+        return [entry for entry in intervals[position][2] if address in ipaddress.ip_network(entry["value"])]
+
+    def match(self, log: Dict[str, Any]) -> List[Dict[str, Any]]:
+        matches = []
+        if log["user_id"] in self.user_ids:
+            matches.append(self.user_ids[log["user_id"]])
+        if log.get("ip"):
+            try:
+                address = ipaddress.ip_address(log["ip"])
+            except ValueError:
+                return matches
+            # Watched IPs are stored normalized, so compare the canonical form
+            # (e.g. compressed IPv6) rather than the raw log string.
+            if str(address) in self.ips:
+                matches.append(self.ips[str(address)])
+            matches.extend(self.match_cidr(address))
+        return matches
+
+    def check(self, logs: List[Dict[str, Any]]) -> None:
+        if not (self.user_ids or self.ips or any(starts for starts, _ in self.ranges.values())):
+            return
+        cutoff = time.time() - WATCHLIST_MAX_AGE
+        for log in logs:
+            if log["date_last"] < cutoff:
+                continue
+            for entry in self.match(log):
+                note = f" — {escape(entry['note'])}" if entry.get("note") else ""
+                self.alerts.raise_alert(
+                    "watchlist",
+                    f"watchlist:{entry['kind']}:{entry['value']}:{log['user_id']}:{log.get('ip')}",
+                    f"👁️ Watchlist match on {entry['kind'].replace('_', ' ')} `{escape(entry['value'])}`{note}\n"
+                    f"<@{log['user_id']}> logged in from `{escape(log.get('ip'))}` "
+                    f"({escape(log.get('country'))}, {escape(log.get('isp'))}).",
+                )
+
+
+watchlist = Watchlist()
+
+
+async def refresh_watchlist() -> None:
+    # Entries are edited from the Slack app process; this process picks the
+    # changes up from Elasticsearch.
+    while True:
+        try:
+            watchlist.load(await load_watch_entries())
+        except Exception as e:
+            print(f"⚠️ Error loading watchlist: {e}")
+        await asyncio.sleep(WATCHLIST_REFRESH_INTERVAL)
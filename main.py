@@ -1,40 +1,89 @@
 import asyncio
 import multiprocessing
-from config import app, PORT
+from config import app, PORT, METRICS_PORT
 from commands.sonar import handle_sonar
 from actions.load_more import load_more
 from actions.prev_page import prev_page
+from actions.export import export_results
 # from actions.alt_pagination import handle_alt_page
 from actions.sonar_actions import handle_sonar_action
-from logs.data_fetcher import fetch_historical_data, fetch_incremental_data
-from utils.elastic_search import create_index
-# from utils.slack_utils import check_bot_channel
+from logs.data_fetcher import (
+    fetch_historical_data,
+    fetch_incremental_data,
+    replay_spool,
+    ensure_rollup,
+    maintain_indices,
+    seed_ingestion_metrics,
+)
+from logs.checkpoints import create_checkpoint_index
+from logs.watchlist import refresh_watchlist
+from utils.elastic_search import create_index, create_rollup_index
+from utils.watchlist import create_watchlist_index
+from utils.metrics import start_metrics_server
+from utils.channel_guard import channel_guard
+from utils.slack_utils import run_profile_refresh
 from view.search_modal import handle_search
+from view.batch_modal import handle_batch
+from view.watchlist_modal import handle_watchlist
+from events.user_change import handle_user_change, handle_team_join
+from events.channels import (
+    handle_member_joined_channel,
+    handle_channel_joined,
+    handle_member_left_channel,
+)
 
 app.command("/sonar")(handle_sonar)
 
 app.action("search_action")(handle_sonar_action)
-# app.action("find_alts_action")(handle_sonar_action)
+app.action("find_alts_action")(handle_sonar_action)
+app.action("batch_action")(handle_sonar_action)
+app.action("watchlist_action")(handle_sonar_action)
 app.action("load_more")(load_more)
 app.action("prev_page")(prev_page)
+app.action("export_csv")(export_results)
+app.action("export_jsonl")(export_results)
 # app.action("next_alt_page")(handle_alt_page)
 # app.action("prev_alt_page")(handle_alt_page)
 app.view("search_modal")(handle_search)
+app.view("batch_modal")(handle_batch)
+app.view("watchlist_modal")(handle_watchlist)
+
+app.event("user_change")(handle_user_change)
+app.event("team_join")(handle_team_join)
+app.event("member_joined_channel")(handle_member_joined_channel)
+app.event("channel_joined")(handle_channel_joined)
+app.event("member_left_channel")(handle_member_left_channel)
 
 
 async def data_fetcher():
+    start_metrics_server(METRICS_PORT)
     await create_index()
+    await create_checkpoint_index()
+    await seed_ingestion_metrics()
+    await create_rollup_index()
+    await create_watchlist_index()
+    await ensure_rollup()
     historical_fetch_task = asyncio.create_task(fetch_historical_data())
     incremental_fetch_task = asyncio.create_task(fetch_incremental_data())
-    await asyncio.gather(incremental_fetch_task)
+    replay_task = asyncio.create_task(replay_spool())
+    maintenance_task = asyncio.create_task(maintain_indices())
+    watchlist_task = asyncio.create_task(refresh_watchlist())
+    await asyncio.gather(incremental_fetch_task, replay_task, maintenance_task, watchlist_task)
 
 
 def run_data_fetcher():
     asyncio.run(data_fetcher())
 
 
+async def start_background_tasks(web_app):
+    web_app["channel_guard"] = asyncio.create_task(channel_guard.run())
+    web_app["profile_refresh"] = asyncio.create_task(run_profile_refresh())
+
+
 def run_slack_app():
-    app.start(PORT)
+    server = app.server(PORT)
+    server.web_app.on_startup.append(start_background_tasks)
+    server.start()
 
 
 if __name__ == "__main__":
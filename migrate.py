@@ -0,0 +1,121 @@
+"""Moves log indices on an older mapping version onto the current one.
+
+Every index behind the read alias that is not on the current mapping version
+(including the pre-partitioning ES_INDEX) is copied into the current monthly
+indices with a sliced reindex, then dropped from the alias in one atomic
+update. Ingestion keeps running throughout, since it already writes to the
+current version.
+
+Usage: python migrate.py [--delete]
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict
+from config import es, ES_READ_ALIAS
+from utils.elastic_search import (
+    INDEX_PREFIX, create_index, ensure_month_index, month_index, month_starts, outdated_indices,
+)
+
+# Reindex writes to a single destination unless the script picks one, so each
+# document is routed to the monthly index of its date_last ("2024-05-..." ->
+# "<prefix>2024.05").
+ROUTE_SCRIPT = """
+ctx._index = params.prefix + ctx._source.date_last.substring(0, 7).replace('-', '.');
+"""
+
+
+async def prepare_months(source: str) -> None:
+    # Create the destination months up front so they pick up the current
+    # template (settings, mappings, alias) even where auto-create is disabled.
+    response = await es.search(
+        index=source,
+        body={
+            "size": 0,
+            "aggs": {
+                "oldest": {"min": {"field": "date_last"}},
+                "newest": {"max": {"field": "date_last"}},
+            },
+        },
+    )
+    oldest = response["aggregations"]["oldest"]["value"]
+    newest = response["aggregations"]["newest"]["value"]
+    if oldest is None:
+        return
+    start = datetime.fromtimestamp(oldest / 1000, tz=timezone.utc)
+    end = datetime.fromtimestamp(newest / 1000, tz=timezone.utc)
+    for month in month_starts(start, end):
+        await ensure_month_index(month_index(month))
+
+
+async def wait_for_task(task_id: str, poll_interval: float) -> Dict[str, Any]:
+    while True:
+        task = await es.tasks.get(task_id=task_id)
+        status = task["task"]["status"]
+        print(
+            f"🚚 {status.get('created', 0)} created, {status.get('version_conflicts', 0)} already present "
+            f"of {status.get('total', 0)}."
+        )
+        if task.get("completed"):
+            if "error" in task:
+                raise RuntimeError(task["error"])
+            return task["response"]
+        await asyncio.sleep(poll_interval)
+
+
+async def migrate_index(source: str, batch_size: int, poll_interval: float, delete: bool) -> bool:
+    print(f"🔁 Migrating {source} into {INDEX_PREFIX}*...")
+    await prepare_months(source)
+    # op_type create skips documents ingestion has already written to the new
+    # version, and slices=auto runs one slice per source shard in parallel.
+    response = await es.reindex(
+        source={"index": source, "size": batch_size},
+        dest={"index": f"{INDEX_PREFIX}unrouted", "op_type": "create"},
+        script={"source": ROUTE_SCRIPT, "lang": "painless", "params": {"prefix": INDEX_PREFIX}},
+        conflicts="proceed",
+        slices="auto",
+        refresh=True,
+        wait_for_completion=False,
+    )
+    result = await wait_for_task(response["task"], poll_interval)
+    if result.get("failures"):
+        print(f"⚠️ {len(result['failures'])} failures migrating {source}; leaving it in {ES_READ_ALIAS}.")
+        return False
+
+    # The new indices are already behind the alias, so removing the old one is
+    # the whole swap: searches see every document throughout.
+    await es.indices.update_aliases(actions=[{"remove": {"index": source, "alias": ES_READ_ALIAS}}])
+    print(f"✅ Migrated {source}: {result.get('created', 0)} documents copied.")
+    if delete:
+        await es.indices.delete(index=source)
+        print(f"🗑️ Deleted {source}.")
+    return True
+
+
+async def run(args: argparse.Namespace) -> bool:
+    try:
+        await create_index()
+        sources = await outdated_indices()
+        if not sources:
+            print("✅ Every index is on the current mapping version.")
+        results = [
+            await migrate_index(source, args.batch_size, args.poll_interval, args.delete) for source in sources
+        ]
+        return all(results)
+    finally:
+        await es.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reindex older log indices onto the current mapping version.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="documents per reindex scroll batch")
+    parser.add_argument("--poll-interval", type=float, default=10, help="seconds between progress reports")
+    parser.add_argument("--delete", action="store_true", help="delete each old index once it is migrated")
+    if not asyncio.run(run(parser.parse_args())):
+        # Failed sources stay behind the read alias; rerun once the cause is fixed.
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
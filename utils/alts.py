@@ -0,0 +1,120 @@
+import math
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from config import ROLLUP_INDEX, ALT_MAX_IPS, ALT_MAX_IP_USERS
+from utils.elastic_search import budgeted, note_timed_out
+
+PAIR_FIELDS = ["user_id", "ip", "first_seen", "last_seen", "count", "user_agent"]
+# A shared IP used by exactly two accounts carries full weight.
+RARITY_BASE = math.log2(3)
+
+
+def parse_time(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def ua_tokens(user_agent: Optional[str]) -> set:
+    return set(re.findall(r"[A-Za-z]+(?:/[\d.]+)?", user_agent or ""))
+
+
+def ua_similarity(a: Optional[str], b: Optional[str]) -> float:
+    tokens_a, tokens_b = ua_tokens(a), ua_tokens(b)
+    if not tokens_a or not tokens_b:
+        return 0.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+
+def time_overlap(a: Dict[str, Any], b: Dict[str, Any]) -> float:
+    # 1.0 when the two accounts were active on the IP at the same time,
+    # decaying with a 30-day half-life as the gap between them grows.
+    start = max(parse_time(a["first_seen"]), parse_time(b["first_seen"]))
+    end = min(parse_time(a["last_seen"]), parse_time(b["last_seen"]))
+    gap_days = max(0.0, start - end) / 86400
+    return 0.5 ** (gap_days / 30)
+
+
+def ip_evidence(target: Dict[str, Any], candidate: Dict[str, Any], degree: int) -> float:
+    rarity = RARITY_BASE / math.log2(1 + max(degree, 2))
+    similarity = 0.5 + 0.3 * time_overlap(target, candidate) + 0.2 * ua_similarity(
+        target.get("user_agent"), candidate.get("user_agent")
+    )
+    return min(0.95, 0.6 * rarity * similarity)
+
+
+async def fetch_user_pairs(user_id: str) -> List[Dict[str, Any]]:
+    body = {
+        "query": {"term": {"user_id": user_id}},
+        "sort": [{"last_seen": "desc"}],
+        "size": ALT_MAX_IPS,
+        "_source": PAIR_FIELDS,
+    }
+    response = await budgeted(body).search(index=ROLLUP_INDEX, body=body)
+    note_timed_out(response)
+    return [hit["_source"] for hit in response["hits"]["hits"]]
+
+
+async def fetch_ip_neighbours(ips: List[str]) -> List[Dict[str, Any]]:
+    # One msearch for every IP; each sub-search is capped so a shared NAT or
+    # VPN exit cannot explode the fan-out, while its total still gives the
+    # IP's true degree for rarity weighting.
+    searches: List[Dict[str, Any]] = []
+    for ip in ips:
+        searches.append({"index": ROLLUP_INDEX})
+        searches.append({
+            "query": {"term": {"ip": ip}},
+            "sort": [{"last_seen": "desc"}],
+            "size": ALT_MAX_IP_USERS,
+            "track_total_hits": True,
+            "_source": PAIR_FIELDS,
+        })
+    response = await budgeted(*searches[1::2]).msearch(searches=searches)
+    note_timed_out(*response["responses"])
+    return response["responses"]
+
+
+async def find_alts(user_id: Optional[str], confidence_threshold: float = 0.5) -> List[Dict[str, Any]]:
+    if not user_id:
+        raise ValueError("User ID is required to find alt accounts")
+
+    target_pairs = {pair["ip"]: pair for pair in await fetch_user_pairs(user_id)}
+    if not target_pairs:
+        return []
+
+    candidates: Dict[str, Dict[str, Any]] = {}
+    ips = list(target_pairs)
+    for ip, result in zip(ips, await fetch_ip_neighbours(ips)):
+        if "error" in result:
+            print(f"⚠️ Error fetching neighbours for {ip}: {result['error']}")
+            continue
+        degree = result["hits"]["total"]["value"]
+        for hit in result["hits"]["hits"]:
+            neighbour = hit["_source"]
+            if neighbour["user_id"] == user_id:
+                continue
+            evidence = ip_evidence(target_pairs[ip], neighbour, degree)
+            candidate = candidates.setdefault(
+                neighbour["user_id"],
+                {"user_id": neighbour["user_id"], "miss": 1.0, "shared_ips": 0, "best": 0.0},
+            )
+            # Noisy-OR: each shared IP is independent evidence of the same owner.
+            candidate["miss"] *= 1 - evidence
+            candidate["shared_ips"] += 1
+            if evidence > candidate["best"]:
+                candidate["best"] = evidence
+                candidate["shared_ip"] = ip
+
+    alts = [
+        {
+            "user_id": candidate["user_id"],
+            "confidence": 1 - candidate["miss"],
+            "shared_ip": candidate["shared_ip"],
+            "shared_ips": candidate["shared_ips"],
+        }
+        for candidate in candidates.values()
+        if 1 - candidate["miss"] >= confidence_threshold
+    ]
+    alts.sort(key=lambda alt: alt["confidence"], reverse=True)
+    return alts
@@ -0,0 +1,78 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+from config import AUTH_CACHE_TTL, AUTH_NEGATIVE_CACHE_TTL
+
+
+def is_admin(user: Dict[str, Any]) -> bool:
+    return not user.get("deleted", False) and bool(user.get("is_admin", False) or user.get("is_owner", False))
+
+
+class AuthCache:
+    """Caches whether each user is a workspace admin or owner.
+
+    Grants are trusted for AUTH_CACHE_TTL and denials for the shorter
+    AUTH_NEGATIVE_CACHE_TTL. Past half its lifetime an entry is still served
+    while a background lookup refreshes it, so clicks never wait on Slack for
+    a known user. user_change events overwrite entries immediately, which is
+    how revocations normally land; a users.list pass that started before an
+    entry was last written leaves it alone.
+    """
+
+    def __init__(self, lookup: Callable[[str], Awaitable[Dict[str, Any]]]) -> None:
+        self.lookup = lookup
+        self.entries: Dict[str, Tuple[bool, float]] = {}
+        self.in_flight: Dict[str, asyncio.Task] = {}
+        self.refreshing: Set[asyncio.Task] = set()
+
+    def ttl(self, authorized: bool) -> float:
+        return AUTH_CACHE_TTL if authorized else AUTH_NEGATIVE_CACHE_TTL
+
+    def set(self, user_id: str, authorized: bool) -> None:
+        self.entries[user_id] = (authorized, time.monotonic())
+
+    def update_from_profile(self, user: Dict[str, Any], since: Optional[float] = None) -> None:
+        # 'since' is when the caller's data was read; newer entries win.
+        entry = self.entries.get(user["id"])
+        if since is not None and entry is not None and entry[1] >= since:
+            return
+        self.set(user["id"], is_admin(user))
+
+    async def fetch(self, user_id: str) -> bool:
+        user = await self.lookup(user_id)
+        authorized = is_admin(user)
+        self.set(user_id, authorized)
+        return authorized
+
+    def start_fetch(self, user_id: str) -> asyncio.Task:
+        # Concurrent checks for the same user share one users.info call.
+        task = self.in_flight.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self.fetch(user_id))
+            self.in_flight[user_id] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(user_id, None))
+        return task
+
+    def refresh_in_background(self, user_id: str) -> None:
+        if user_id in self.in_flight:
+            return
+        task = self.start_fetch(user_id)
+        self.refreshing.add(task)
+
+        def done(finished: asyncio.Task) -> None:
+            self.refreshing.discard(finished)
+            if not finished.cancelled() and finished.exception():
+                print(f"⚠️ Error refreshing authorization for {user_id}: {finished.exception()}")
+
+        task.add_done_callback(done)
+
+    async def is_authorized(self, user_id: str) -> bool:
+        entry = self.entries.get(user_id)
+        if entry is not None:
+            authorized, fetched = entry
+            age = time.monotonic() - fetched
+            if age < self.ttl(authorized):
+                if age >= self.ttl(authorized) / 2:
+                    self.refresh_in_background(user_id)
+                return authorized
+        return await asyncio.shield(self.start_fetch(user_id))
@@ -0,0 +1,71 @@
+import ipaddress
+import re
+from typing import Any, Dict, List, Tuple
+from config import ROLLUP_INDEX, BATCH_MAX_CONCURRENT_SEARCHES
+from utils.elastic_search import budgeted, note_timed_out
+
+USER_ID_PATTERN = re.compile(r"^[UW][A-Z0-9]{6,}$")
+
+
+def parse_entities(text: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    # Accepts IDs and IPs separated by whitespace, commas or semicolons, as
+    # pasted from a channel or exported from a spreadsheet. Slack mentions
+    # (<@U123|name>) are unwrapped.
+    entities: Dict[str, str] = {}
+    invalid: List[str] = []
+    for token in re.split(r"[\s,;]+", text):
+        token = token.strip().strip("<>@").split("|")[0]
+        if not token or token in entities:
+            continue
+        try:
+            entities[str(ipaddress.ip_address(token))] = "ip"
+        except ValueError:
+            if USER_ID_PATTERN.match(token):
+                entities[token] = "user_id"
+            else:
+                invalid.append(token)
+    return [(kind, value) for value, kind in entities.items()], invalid
+
+
+def entity_search(kind: str, value: str) -> Dict[str, Any]:
+    # The rollup holds one document per (user, IP) pair, so the hit count for
+    # a user is its IP count and the hit count for an IP is its user count.
+    return {
+        "query": {"term": {kind: value}},
+        "size": 0,
+        "track_total_hits": True,
+        "aggs": {
+            "last_seen": {"max": {"field": "last_seen"}},
+            "countries": {"terms": {"field": "country", "size": 5}},
+        },
+    }
+
+
+async def investigate(entities: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    if not entities:
+        return []
+    searches: List[Dict[str, Any]] = []
+    for kind, value in entities:
+        searches.append({"index": ROLLUP_INDEX})
+        searches.append(entity_search(kind, value))
+    # One round trip for the whole list; ES runs at most
+    # BATCH_MAX_CONCURRENT_SEARCHES of the sub-searches at a time.
+    response = await budgeted(*searches[1::2]).msearch(
+        searches=searches, max_concurrent_searches=BATCH_MAX_CONCURRENT_SEARCHES
+    )
+    note_timed_out(*response["responses"])
+
+    summaries = []
+    for (kind, value), result in zip(entities, response["responses"]):
+        summary: Dict[str, Any] = {"kind": kind, "value": value}
+        if "error" in result:
+            summary["error"] = result["error"].get("reason", str(result["error"]))
+        else:
+            aggregations = result["aggregations"]
+            summary.update({
+                "pairs": result["hits"]["total"]["value"],
+                "last_seen": aggregations["last_seen"].get("value_as_string"),
+                "countries": [bucket["key"] for bucket in aggregations["countries"]["buckets"]],
+            })
+        summaries.append(summary)
+    return summaries
@@ -0,0 +1,73 @@
+import asyncio
+from typing import Any, Dict, Set
+from config import app, ALLOWED_CHANNEL_ID, CHANNEL_RECONCILE_INTERVAL, CHANNEL_LEAVE_CONCURRENCY
+from utils.slack_utils import remove_bot_from_channel
+
+
+class ChannelGuard:
+    """Keeps the bot out of every channel except ALLOWED_CHANNEL_ID.
+
+    Join events are acted on as they arrive. A periodic pass over the bot's
+    own memberships catches anything the events missed, and only acts on
+    channels that appeared since the previous pass.
+    """
+
+    def __init__(self, concurrency: int = CHANNEL_LEAVE_CONCURRENCY) -> None:
+        self.members: Set[str] = set()
+        self.leaving: Set[str] = set()
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def leave(self, channel: Dict[str, Any]) -> None:
+        channel_id = channel["id"]
+        if channel_id == ALLOWED_CHANNEL_ID or channel_id in self.leaving:
+            return
+        self.leaving.add(channel_id)
+        try:
+            async with self.semaphore:
+                await remove_bot_from_channel(channel)
+        finally:
+            # A failed leave is picked up again by the next reconciliation.
+            self.leaving.discard(channel_id)
+            self.members.discard(channel_id)
+
+    async def on_joined(self, channel: Dict[str, Any]) -> None:
+        self.members.add(channel["id"])
+        await self.leave(channel)
+
+    def on_left(self, channel_id: str) -> None:
+        self.members.discard(channel_id)
+
+    async def current_channels(self) -> Dict[str, Dict[str, Any]]:
+        # users.conversations only lists channels the bot is in, unlike a
+        # scan of every channel in the workspace.
+        channels: Dict[str, Dict[str, Any]] = {}
+        cursor = None
+        while True:
+            response = await app.client.users_conversations(
+                types="public_channel,private_channel", exclude_archived=True, limit=1000, cursor=cursor
+            )
+            for channel in response.get("channels", []):
+                channels[channel["id"]] = channel
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                return channels
+
+    async def reconcile(self) -> None:
+        channels = await self.current_channels()
+        joined = set(channels) - self.members
+        self.members = set(channels)
+        violations = [channels[channel_id] for channel_id in joined if channel_id != ALLOWED_CHANNEL_ID]
+        if violations:
+            print(f"🛡️ Reconciliation found the bot in {len(violations)} non-allowed channels.")
+            await asyncio.gather(*(self.leave(channel) for channel in violations))
+
+    async def run(self, interval: float = CHANNEL_RECONCILE_INTERVAL) -> None:
+        while True:
+            try:
+                await self.reconcile()
+            except Exception as e:
+                print(f"⚠️ Error reconciling bot channels: {e}")
+            await asyncio.sleep(interval)
+
+
+channel_guard = ChannelGuard()
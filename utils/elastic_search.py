@@ -1,19 +1,133 @@
-from config import ES_INDEX, es
-from typing import Dict, List, Tuple, Optional, Any
+import re
+import time
+from config import ES_INDEX, ES_READ_ALIAS, ROLLUP_INDEX, SEARCH_PIT_KEEP_ALIVE, es
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from elasticsearch import NotFoundError
+from typing import Dict, List, Set, Tuple, Optional, Any
+
+
+# Bump whenever LOG_MAPPINGS or LOG_SETTINGS change in a way existing indices
+# cannot pick up; `python migrate.py` moves older indices onto the new version.
+MAPPING_VERSION = 2
+INDEX_PREFIX = f"{ES_INDEX}-v{MAPPING_VERSION}-"
+MONTH_SUFFIX = re.compile(r"\d{4}\.\d{2}")
+
+KEYWORD_SUBFIELD: Dict[str, Any] = {"keyword": {"type": "keyword", "ignore_above": 512}}
+
+LOG_MAPPINGS: Dict[str, Any] = {
+    "properties": {
+        "user_id": {"type": "keyword"},
+        "username": {"type": "text", "fields": KEYWORD_SUBFIELD},
+        "date_first": {"type": "date"},
+        "date_last": {"type": "date"},
+        "count": {"type": "integer"},
+        "ip": {"type": "ip"},
+        "user_agent": {"type": "text", "fields": KEYWORD_SUBFIELD},
+        "isp": {"type": "text", "fields": KEYWORD_SUBFIELD},
+        "country": {"type": "keyword"},
+        "region": {"type": "keyword"},
+    }
+}
+
+# Segments are kept sorted newest first so queries sorted on date_last can
+# stop after the top hits instead of sorting every match.
+LOG_SETTINGS: Dict[str, Any] = {
+    "index.sort.field": "date_last",
+    "index.sort.order": "desc",
+}
+
+
+def month_index(moment: datetime) -> str:
+    return f"{INDEX_PREFIX}{moment:%Y.%m}"
+
+
+def month_starts(start: datetime, end: datetime) -> List[datetime]:
+    months = []
+    month = datetime(start.year, start.month, 1, tzinfo=timezone.utc)
+    while month <= end:
+        months.append(month)
+        month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=timezone.utc)
+    return months
+
+
+async def search_indices(start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
+    # Only the current-version months overlapping the requested range are
+    # searched, plus older indices for those months that are still behind the
+    # read alias. migrate.py drops an index from the alias once it has been
+    # copied, so migrated documents are never read twice.
+    if not (start_date and end_date):
+        return ES_READ_ALIAS
+    start = datetime.fromisoformat(start_date).replace(tzinfo=timezone.utc)
+    end = datetime.fromisoformat(end_date).replace(tzinfo=timezone.utc)
+    months = {f"{month:%Y.%m}" for month in month_starts(start, end)}
+    indices = [f"{INDEX_PREFIX}{month}" for month in sorted(months)]
+    for index in await outdated_indices():
+        suffix = index.rsplit("-", 1)[-1]
+        # Older monthly indices outside the range are skipped; anything else
+        # (the pre-partitioning ES_INDEX) may hold any date.
+        if suffix in months or not MONTH_SUFFIX.fullmatch(suffix):
+            indices.append(index)
+    return ",".join(indices)
+
+
+async def outdated_indices() -> List[str]:
+    # Indices behind the read alias on an older mapping version, including the
+    # pre-partitioning ES_INDEX, until `python migrate.py` drops them.
+    try:
+        aliases = await es.indices.get_alias(name=ES_READ_ALIAS)
+    except NotFoundError:
+        return []
+    return sorted(index for index in aliases if not index.startswith(INDEX_PREFIX))
+
+
+known_indices: Set[str] = set()
+
+
+async def ensure_month_index(index: str) -> None:
+    if index in known_indices:
+        return
+    # The index template supplies mappings and the read alias.
+    await es.options(ignore_status=[400]).indices.create(index=index)
+    known_indices.add(index)
+
+
+async def force_merge(index: str) -> None:
+    await es.options(request_timeout=3600).indices.forcemerge(index=index, max_num_segments=1)
+    print(f"🗜️ Force-merged {index}.")
 
 
 async def create_index() -> None:
+    await es.indices.put_index_template(
+        name=f"{ES_INDEX}-monthly-v{MAPPING_VERSION}",
+        index_patterns=[f"{INDEX_PREFIX}*"],
+        priority=MAPPING_VERSION,
+        template={"settings": LOG_SETTINGS, "mappings": LOG_MAPPINGS, "aliases": {ES_READ_ALIAS: {}}},
+    )
+    now = datetime.now(timezone.utc)
+    await ensure_month_index(month_index(now))
+
+    if await es.options(ignore_status=[404]).indices.exists(index=ES_INDEX) and not (
+        await es.options(ignore_status=[404]).indices.exists_alias(name=ES_INDEX)
+    ):
+        await es.indices.put_alias(index=ES_INDEX, name=ES_READ_ALIAS)
+    print("🗂️ Index created or already exists.")
+
+
+async def create_rollup_index() -> None:
     await es.options(ignore_status=[400]).indices.create(
-        index=ES_INDEX,
+        index=ROLLUP_INDEX,
         body={
             "mappings": {
                 "properties": {
                     "user_id": {"type": "keyword"},
-                    "username": {"type": "text"},
-                    "date_first": {"type": "date"},
-                    "date_last": {"type": "date"},
-                    "count": {"type": "integer"},
                     "ip": {"type": "ip"},
+                    "username": {"type": "text"},
+                    "first_seen": {"type": "date"},
+                    "last_seen": {"type": "date"},
+                    "count": {"type": "long"},
+                    # Latest count per session, only ever read back by the rollup script.
+                    "counts": {"type": "object", "enabled": False},
                     "user_agent": {"type": "text"},
                     "isp": {"type": "text"},
                     "country": {"type": "keyword"},
@@ -22,18 +136,45 @@ async def create_index() -> None:
             }
         },
     )
-    print("🗂️ Index created or already exists.")
+    # Rollups created before per-session counts need the field added too.
+    await es.indices.put_mapping(index=ROLLUP_INDEX, properties={"counts": {"type": "object", "enabled": False}})
 
 
-async def standard_search(
-    user_id: Optional[str] = None,
-    ip_address: Optional[str] = None,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    sort_by: str = "date_last",
-    page: int = 1,
-    size: int = 10,
-) -> Tuple[List[Dict[str, Any]], int]:
+class SearchBudget:
+    """Deadline for one interactive search, set by the search executor."""
+
+    def __init__(self, deadline: float) -> None:
+        self.deadline = deadline
+        self.timed_out = False
+
+    def remaining(self) -> float:
+        return max(0.001, self.deadline - time.monotonic())
+
+
+search_budget: ContextVar[Optional[SearchBudget]] = ContextVar("search_budget", default=None)
+
+
+def budgeted(*bodies: Dict[str, Any]) -> Any:
+    # Within a search budget, shards stop collecting at the deadline and return
+    # what they have, and the HTTP request is abandoned shortly after (which
+    # also cancels the search in ES).
+    budget = search_budget.get()
+    if budget is None:
+        return es
+    for body in bodies:
+        body["timeout"] = f"{int(budget.remaining() * 1000)}ms"
+    return es.options(request_timeout=budget.remaining() + 1)
+
+
+def note_timed_out(*responses: Dict[str, Any]) -> None:
+    budget = search_budget.get()
+    if budget is not None and any(response.get("timed_out") for response in responses):
+        budget.timed_out = True
+
+
+def build_standard_query(
+    user_id: Optional[str], ip_address: Optional[str], start_date: Optional[str], end_date: Optional[str]
+) -> Dict[str, Any]:
     query: Dict[str, Any] = {"bool": {"must": []}}
     if user_id:
         query["bool"]["must"].append({"term": {"user_id": user_id}})
@@ -43,21 +184,82 @@ async def standard_search(
         query["bool"]["must"].append(
             {"range": {"date_last": {"gte": start_date, "lte": end_date}}}
         )
+    return query
+
 
+async def open_pit(index: str) -> str:
+    response = await es.open_point_in_time(
+        index=index, keep_alive=SEARCH_PIT_KEEP_ALIVE, ignore_unavailable=True
+    )
+    return response["id"]
+
+
+async def close_pit(pit_id: str) -> None:
+    await es.options(ignore_status=[404]).close_point_in_time(id=pit_id)
+
+
+async def standard_search(
+    user_id: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    sort_by: str = "date_last",
+    page: int = 1,
+    size: int = 10,
+    pit_id: Optional[str] = None,
+    search_after: Optional[List[Any]] = None,
+    search_before: Optional[List[Any]] = None,
+) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+    query = build_standard_query(user_id, ip_address, start_date, end_date)
+    index = await search_indices(start_date, end_date)
+
+    # Results are read from a point in time so pages stay stable while
+    # ingestion writes; Next continues after the last hit's sort values and
+    # Prev runs the sort in reverse from the first hit's.
+    order, tiebreak = ("asc", "desc") if search_before else ("desc", "asc")
+    if not pit_id and (search_after or search_before):
+        # Cursors without a point in time come from the offset fallback below.
+        return await offset_search(index, query, sort_by, page, size)
+    try:
+        if not pit_id:
+            pit_id = await open_pit(index)
+        body: Dict[str, Any] = {
+            "query": query,
+            "sort": [{sort_by: {"order": order}}, {"_shard_doc": {"order": tiebreak}}],
+            "size": size,
+            "pit": {"id": pit_id, "keep_alive": SEARCH_PIT_KEEP_ALIVE},
+        }
+        if search_before or search_after:
+            body["search_after"] = search_before or search_after
+        response = await budgeted(body).search(body=body)
+        note_timed_out(response)
+        hits = response["hits"]["hits"]
+        if search_before:
+            hits.reverse()
+        return hits, response["hits"]["total"]["value"], response.get("pit_id", pit_id)
+    except NotFoundError:
+        # The point in time expired between clicks; fall back to offset paging.
+        return await offset_search(index, query, sort_by, page, size)
+    except Exception as e:
+        return [{"error": f"⚠️ Error querying Elasticsearch: {str(e)}"}], 0, None
+
+
+async def offset_search(
+    index: str, query: Dict[str, Any], sort_by: str, page: int, size: int
+) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
     start: int = (page - 1) * size
     try:
-        response = await es.search(
-            index=ES_INDEX,
-            body={
-                "query": query,
-                "sort": [{sort_by: {"order": "desc"}}],
-                "from": start,
-                "size": size,
-            },
-        )
-        return response["hits"]["hits"], response["hits"]["total"]["value"]
+        body = {
+            "query": query,
+            "sort": [{sort_by: {"order": "desc"}}],
+            "from": start,
+            "size": size,
+        }
+        response = await budgeted(body).search(index=index, ignore_unavailable=True, body=body)
+        note_timed_out(response)
+        return response["hits"]["hits"], response["hits"]["total"]["value"], None
     except Exception as e:
-        return [{"error": f"⚠️ Error querying Elasticsearch: {str(e)}"}], 0
+        return [{"error": f"⚠️ Error querying Elasticsearch: {str(e)}"}], 0, None
 
 
 async def fetch_unique(
@@ -69,6 +271,8 @@ async def fetch_unique(
     size: int = 10,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
 ) -> Tuple[List[Dict[str, Any]], int]:
     if not term_value:
         return [
@@ -88,48 +292,57 @@ async def fetch_unique(
             {"range": {date_field: {"gte": start_date, "lte": end_date}}}
         )
 
+    # Pages are walked in key order with a composite aggregation: Next resumes
+    # after the last key shown, Prev walks backwards from the first key shown.
+    composite: Dict[str, Any] = {
+        "size": size,
+        "sources": [
+            {agg_field: {"terms": {"field": agg_field, "order": "desc" if before else "asc"}}}
+        ],
+    }
+    if before or after:
+        composite["after"] = {agg_field: before or after}
+
     try:
-        response = await es.search(
-            index=ES_INDEX,
-            body={
-                "size": 0,
-                "query": query,
-                "aggs": {
-                    "unique_values": {
-                        "terms": {
-                            "field": agg_field,
-                            "size": 10000, 
-                            "order": {"latest_activity": "desc"}
-                        },
-                        "aggs": {
-                            "latest_activity": {
-                                "max": {"field": date_field}
-                            },
-                            "latest_doc": {
-                                "top_hits": {
-                                    "size": 1,
-                                    "_source": ["ip", "user_id", "date_first", "date_last", "count"],
-                                    "sort": [{date_field: "desc"}]
-                                }
+        body = {
+            "size": 0,
+            "query": query,
+            "aggs": {
+                "total": {
+                    "cardinality": {"field": agg_field, "precision_threshold": 3000}
+                },
+                "unique_values": {
+                    "composite": composite,
+                    "aggs": {
+                        "latest_doc": {
+                            "top_hits": {
+                                "size": 1,
+                                "_source": ["ip", "user_id", "date_first", "date_last", "count"],
+                                "sort": [{date_field: "desc"}]
                             }
                         }
                     }
                 }
             }
+        }
+        response = await budgeted(body).search(
+            index=await search_indices(start_date, end_date), ignore_unavailable=True, body=body
         )
+        note_timed_out(response)
 
         buckets = response["aggregations"]["unique_values"]["buckets"]
-        total = len(buckets)
-
-        start_idx = (page - 1) * size
-        end_idx = start_idx + size
-        page_buckets = buckets[start_idx:end_idx]
+        if before:
+            buckets.reverse()
+        total = response["aggregations"]["total"]["value"]
+        if not before and len(buckets) < size:
+            # A short page is the last one, which pins down the exact total.
+            total = (page - 1) * size + len(buckets)
 
         results = []
-        for bucket in page_buckets:
+        for bucket in buckets:
             hit = bucket["latest_doc"]["hits"]["hits"][0]["_source"]
             results.append({
-                agg_field: bucket["key"],
+                agg_field: bucket["key"][agg_field],
                 "date_first": hit.get("date_first"),
                 "date_last": hit.get("date_last"),
                 "count": hit.get("count", 0)
@@ -142,14 +355,69 @@ async def fetch_unique(
         return [], 0
 
 
+async def rollup_search(
+    term_field: str,
+    term_value: Optional[str],
+    result_field: str,
+    size: int = 10,
+    after: Optional[List[Any]] = None,
+    before: Optional[List[Any]] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    if not term_value:
+        return [
+            {
+                "error": f"{term_field.replace('_', ' ').title()} is required for this search"
+            }
+        ], 0
+
+    order = "asc" if before else "desc"
+    body: Dict[str, Any] = {
+        "query": {"term": {term_field: term_value}},
+        "sort": [{"last_seen": {"order": order}}, {result_field: {"order": order}}],
+        "size": size,
+        "track_total_hits": True,
+    }
+    if before or after:
+        body["search_after"] = before or after
+
+    try:
+        response = await budgeted(body).search(index=ROLLUP_INDEX, body=body)
+        note_timed_out(response)
+        hits = response["hits"]["hits"]
+        if before:
+            hits.reverse()
+        results = [
+            {
+                result_field: hit["_source"][result_field],
+                "date_first": hit["_source"].get("first_seen"),
+                "date_last": hit["_source"].get("last_seen"),
+                "count": hit["_source"].get("count", 0),
+                "sort": hit["sort"],
+            }
+            for hit in hits
+        ]
+        return results, response["hits"]["total"]["value"]
+    except Exception as e:
+        print(f"Error in rollup_search: {str(e)}")
+        return [], 0
+
+
 async def unique_user_search(
     ip_address: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     page: int = 1,
-    size: int = 10
+    size: int = 10,
+    after: Optional[Any] = None,
+    before: Optional[Any] = None,
 ) -> Tuple[List[Dict[str, Any]], int]:
-    return await fetch_unique("ip", ip_address, "user_id", "date_last", page, size, start_date, end_date)
+    # The rollup only knows first/last seen per pair, so date-bounded searches
+    # still aggregate the raw index.
+    if not (start_date and end_date):
+        return await rollup_search("ip", ip_address, "user_id", size, after, before)
+    return await fetch_unique(
+        "ip", ip_address, "user_id", "date_last", page, size, start_date, end_date, after, before
+    )
 
 
 async def unique_ip_search(
@@ -157,6 +425,12 @@ async def unique_ip_search(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     page: int = 1,
-    size: int = 10
+    size: int = 10,
+    after: Optional[Any] = None,
+    before: Optional[Any] = None,
 ) -> Tuple[List[Dict[str, Any]], int]:
-    return await fetch_unique("user_id", user_id, "ip", "date_last", page, size, start_date, end_date)
+    if not (start_date and end_date):
+        return await rollup_search("user_id", user_id, "ip", size, after, before)
+    return await fetch_unique(
+        "user_id", user_id, "ip", "date_last", page, size, start_date, end_date, after, before
+    )
@@ -0,0 +1,213 @@
+import asyncio
+import csv
+import gzip
+import json
+import os
+import aiohttp
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from config import es, ROLLUP_INDEX, SEARCH_PIT_KEEP_ALIVE, EXPORT_BATCH_SIZE
+from utils.elastic_search import build_standard_query, search_indices, open_pit, close_pit
+from utils.alts import find_alts
+from utils.search_executor import search_executor
+
+Page = List[Dict[str, Any]]
+
+LOG_COLUMNS = [
+    "user_id", "username", "date_first", "date_last", "count",
+    "ip", "user_agent", "isp", "country", "region",
+]
+
+EXPORT_COLUMNS: Dict[str, List[str]] = {
+    "standard_search": LOG_COLUMNS,
+    "date_range": LOG_COLUMNS,
+    "unique_user_for_ip": ["user_id", "date_first", "date_last", "count"],
+    "unique_ip_for_user": ["ip", "date_first", "date_last", "count"],
+    "find_alts": ["user_id", "confidence", "shared_ip", "shared_ips"],
+}
+
+
+async def pit_pages(index: str, query: Dict[str, Any], sort: List[Dict[str, Any]]) -> AsyncIterator[Page]:
+    # Walks every match from one point in time, holding a single page at once.
+    pit_id = await open_pit(index)
+    search_after: Optional[List[Any]] = None
+    try:
+        while True:
+            body: Dict[str, Any] = {
+                "query": query,
+                "sort": sort + [{"_shard_doc": "asc"}],
+                "size": EXPORT_BATCH_SIZE,
+                "pit": {"id": pit_id, "keep_alive": SEARCH_PIT_KEEP_ALIVE},
+                "track_total_hits": False,
+            }
+            if search_after:
+                body["search_after"] = search_after
+            response = await es.search(body=body)
+            pit_id = response.get("pit_id", pit_id)
+            hits = response["hits"]["hits"]
+            if not hits:
+                return
+            yield [hit["_source"] for hit in hits]
+            search_after = hits[-1]["sort"]
+    finally:
+        await close_pit(pit_id)
+
+
+async def composite_pages(
+    term_field: str, term_value: str, agg_field: str, start_date: str, end_date: str
+) -> AsyncIterator[Page]:
+    query = {
+        "bool": {
+            "must": [
+                {"term": {term_field: term_value}},
+                {"range": {"date_last": {"gte": start_date, "lte": end_date}}},
+            ]
+        }
+    }
+    index = await search_indices(start_date, end_date)
+    after: Optional[Dict[str, Any]] = None
+    while True:
+        composite: Dict[str, Any] = {
+            "size": EXPORT_BATCH_SIZE,
+            "sources": [{agg_field: {"terms": {"field": agg_field}}}],
+        }
+        if after:
+            composite["after"] = after
+        response = await es.search(
+            index=index,
+            ignore_unavailable=True,
+            body={
+                "size": 0,
+                "query": query,
+                "aggs": {
+                    "unique_values": {
+                        "composite": composite,
+                        "aggs": {
+                            "date_first": {"min": {"field": "date_first"}},
+                            "date_last": {"max": {"field": "date_last"}},
+                            "count": {"sum": {"field": "count"}},
+                        },
+                    }
+                },
+            },
+        )
+        unique_values = response["aggregations"]["unique_values"]
+        if not unique_values["buckets"]:
+            return
+        yield [
+            {
+                agg_field: bucket["key"][agg_field],
+                "date_first": bucket["date_first"].get("value_as_string"),
+                "date_last": bucket["date_last"].get("value_as_string"),
+                "count": int(bucket["count"]["value"]),
+            }
+            for bucket in unique_values["buckets"]
+        ]
+        after = unique_values.get("after_key")
+        if not after:
+            return
+
+
+async def rollup_pages(term_field: str, term_value: str, result_field: str) -> AsyncIterator[Page]:
+    async for page in pit_pages(
+        ROLLUP_INDEX, {"term": {term_field: term_value}}, [{"last_seen": "desc"}]
+    ):
+        yield [
+            {
+                result_field: pair[result_field],
+                "date_first": pair.get("first_seen"),
+                "date_last": pair.get("last_seen"),
+                "count": pair.get("count", 0),
+            }
+            for pair in page
+        ]
+
+
+async def export_pages(
+    search_type: str,
+    user_id: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    confidence_threshold: float = 0.5,
+) -> AsyncIterator[Page]:
+    if search_type in ("standard_search", "date_range"):
+        query = build_standard_query(user_id, ip_address, start_date, end_date)
+        async for page in pit_pages(await search_indices(start_date, end_date), query, [{"date_last": "desc"}]):
+            yield page
+    elif search_type in ("unique_user_for_ip", "unique_ip_for_user"):
+        term_field, term_value, result_field = (
+            ("ip", ip_address, "user_id") if search_type == "unique_user_for_ip" else ("user_id", user_id, "ip")
+        )
+        if not term_value:
+            raise ValueError(f"{term_field.replace('_', ' ').title()} is required for this search")
+        # Same split as the interactive searches: the rollup unless a date
+        # range needs the raw logs.
+        if start_date and end_date:
+            pages = composite_pages(term_field, term_value, result_field, start_date, end_date)
+        else:
+            pages = rollup_pages(term_field, term_value, result_field)
+        async for page in pages:
+            yield page
+    elif search_type == "find_alts":
+        yield await find_alts(user_id, confidence_threshold)
+    else:
+        raise ValueError(f"Invalid search type: {search_type}")
+
+
+async def scheduled_pages(user_id: str, pages: AsyncIterator[Page]) -> AsyncIterator[Page]:
+    # Each page is one job on the search executor, so a long export takes
+    # turns with interactive searches and counts toward its owner's cap.
+    async def next_page() -> Optional[Page]:
+        return await anext(pages, None)
+
+    try:
+        while True:
+            page, _ = await search_executor.run(user_id, next_page)
+            if page is None:
+                return
+            yield page
+    finally:
+        await pages.aclose()
+
+
+def write_page(out: Any, writer: Optional[csv.DictWriter], page: Page) -> None:
+    if writer:
+        writer.writerows(page)
+    else:
+        out.writelines(json.dumps(row, default=str) + "\n" for row in page)
+
+
+async def write_export(
+    pages: AsyncIterator[Page],
+    path: str,
+    file_format: str,
+    columns: List[str],
+    progress: Callable[[int], Awaitable[None]],
+) -> int:
+    # Compression runs off the event loop; only the current page is in memory.
+    rows = 0
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as out:
+        writer = None
+        if file_format == "csv":
+            writer = csv.DictWriter(out, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+        async for page in pages:
+            await asyncio.to_thread(write_page, out, writer, page)
+            rows += len(page)
+            await progress(rows)
+    return rows
+
+
+async def upload_file(client: Any, path: str, filename: str, channel_id: str, comment: str) -> None:
+    # Slack's external upload flow: reserve an upload URL, stream the file
+    # to it, then share the finished file in the channel.
+    reservation = await client.files_getUploadURLExternal(filename=filename, length=os.path.getsize(path))
+    async with aiohttp.ClientSession() as session:
+        with open(path, "rb") as file:
+            async with session.post(reservation["upload_url"], data=file) as response:
+                response.raise_for_status()
+    await client.files_completeUploadExternal(
+        files=[{"id": reservation["file_id"], "title": filename}],
+        channel_id=channel_id,
+        initial_comment=comment,
+    )
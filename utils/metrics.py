@@ -0,0 +1,66 @@
+import time
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+PAGES_FETCHED = Counter(
+    "sonar_pages_fetched_total", "team.accessLogs pages fetched from Slack"
+)
+DOCUMENTS = Counter(
+    "sonar_documents_total", "Access log documents sent to Elasticsearch", ["result"]
+)
+BULK_LATENCY = Histogram(
+    "sonar_bulk_seconds",
+    "Latency of Elasticsearch bulk requests",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+SLACK_LATENCY = Histogram(
+    "sonar_slack_call_seconds",
+    "Latency of Slack Web API calls, excluding rate-limit waits",
+    ["method"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+RATE_LIMIT_WAIT = Counter(
+    "sonar_rate_limit_wait_seconds_total",
+    "Time spent waiting on the Slack rate limiter",
+    ["method"],
+)
+RATE_LIMITED = Counter(
+    "sonar_rate_limited_total", "Slack calls rejected with HTTP 429", ["method"]
+)
+QUEUE_DEPTH = Gauge(
+    "sonar_queue_depth", "Pages waiting between fetch and sink stages", ["pipeline"]
+)
+SPOOL_SEGMENTS = Gauge(
+    "sonar_spool_segments", "Sealed spool segments waiting to be replayed into Elasticsearch"
+)
+NEWEST_INDEXED = Gauge(
+    "sonar_newest_indexed_timestamp_seconds", "date_last of the newest indexed login"
+)
+INGESTION_LAG = Gauge(
+    "sonar_ingestion_lag_seconds", "Seconds between now and the newest indexed date_last"
+)
+
+ALERTS = Counter(
+    "sonar_alerts_total", "Anomaly alerts raised at ingest", ["rule", "outcome"]
+)
+
+
+newest_indexed = 0
+
+
+def record_indexed(date_last: int) -> None:
+    global newest_indexed
+    if date_last > newest_indexed:
+        newest_indexed = date_last
+        NEWEST_INDEXED.set(date_last)
+
+
+def ingestion_lag() -> float:
+    return time.time() - newest_indexed if newest_indexed else float("nan")
+
+
+INGESTION_LAG.set_function(ingestion_lag)
+
+
+def start_metrics_server(port: int) -> None:
+    start_http_server(port)
+    print(f"📈 Serving metrics on :{port}/metrics")
@@ -0,0 +1,68 @@
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+
+class Profile(NamedTuple):
+    real_name: str
+    display_name: str
+    deleted: bool
+    restricted: bool
+    ultra_restricted: bool
+    is_bot: bool
+
+
+def to_profile(user: Dict[str, Any]) -> Profile:
+    profile = user.get("profile", {})
+    return Profile(
+        real_name=profile.get("real_name") or user.get("real_name") or user.get("name", ""),
+        display_name=profile.get("display_name", ""),
+        deleted=user.get("deleted", False),
+        restricted=user.get("is_restricted", False),
+        ultra_restricted=user.get("is_ultra_restricted", False),
+        is_bot=user.get("is_bot", False),
+    )
+
+
+def describe(profile: Optional[Profile]) -> str:
+    if profile is None:
+        return "Unknown"
+    name = profile.real_name or "N/A"
+    if profile.display_name and profile.display_name != profile.real_name:
+        name += f" ({profile.display_name})"
+    flags = []
+    if profile.deleted:
+        flags.append("🚫 Deactivated")
+    if profile.ultra_restricted:
+        flags.append("🔒 Single-channel guest")
+    elif profile.restricted:
+        flags.append("🔒 Multi-channel guest")
+    if profile.is_bot:
+        flags.append("🤖 Bot")
+    return " · ".join([name] + flags)
+
+
+class ProfileCache:
+    """Compact name and status of every workspace member, kept in memory so a
+    results page can be rendered without per-row users.info calls. Filled
+    from users.list and kept current by user_change and team_join events."""
+
+    def __init__(self) -> None:
+        self.profiles: Dict[str, Profile] = {}
+        self.updated: Dict[str, float] = {}
+
+    def update(self, user: Dict[str, Any], since: Optional[float] = None) -> None:
+        # 'since' is when the caller's data was read; a profile written after
+        # that (by an event mid-pass) is newer and is kept.
+        if since is not None and self.updated.get(user["id"], float("-inf")) >= since:
+            return
+        self.profiles[user["id"]] = to_profile(user)
+        self.updated[user["id"]] = time.monotonic()
+
+    def get(self, user_id: Optional[str]) -> Optional[Profile]:
+        return self.profiles.get(user_id) if user_id else None
+
+    def describe(self, user_id: Optional[str]) -> str:
+        return describe(self.get(user_id))
+
+
+profile_cache = ProfileCache()
@@ -0,0 +1,118 @@
+import asyncio
+import random
+import time
+from typing import Dict, Optional
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.web.async_slack_response import AsyncSlackResponse
+from utils.metrics import SLACK_LATENCY, RATE_LIMIT_WAIT, RATE_LIMITED
+
+# Requests per minute for Slack's published tiers.
+TIER_LIMITS: Dict[str, float] = {
+    "tier1": 1,
+    "tier2": 20,
+    "tier3": 50,
+    "tier4": 100,
+    "special": 60,
+}
+
+METHOD_TIERS: Dict[str, str] = {
+    "team.accessLogs": "tier2",
+    "users.list": "tier2",
+    "users.info": "tier4",
+    "conversations.list": "tier2",
+    "conversations.leave": "tier3",
+    "users.conversations": "tier3",
+    "chat.postMessage": "special",
+    "chat.postEphemeral": "tier4",
+    "chat.update": "tier3",
+    "views.open": "tier4",
+    "views.update": "tier4",
+    "files.getUploadURLExternal": "tier4",
+    "files.completeUploadExternal": "tier4",
+}
+
+MAX_RETRIES = 5
+
+
+class TokenBucket:
+    """Token bucket whose refill rate backs off on 429s and creeps back up on success."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.ceiling = per_minute / 60
+        self.rate = self.ceiling
+        self.capacity = max(1.0, self.ceiling * 3)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        waited = 0.0
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def on_success(self) -> None:
+        self.rate = min(self.ceiling, self.rate + self.ceiling * 0.05)
+
+    def on_throttled(self, retry_after: Optional[float]) -> None:
+        self.rate = max(self.ceiling * 0.1, self.rate / 2)
+        self.tokens = 0
+        self.updated = time.monotonic()
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+
+buckets: Dict[str, TokenBucket] = {}
+
+
+def get_bucket(api_method: str) -> TokenBucket:
+    if api_method not in buckets:
+        tier = METHOD_TIERS.get(api_method, "tier3")
+        buckets[api_method] = TokenBucket(TIER_LIMITS[tier])
+    return buckets[api_method]
+
+
+def retry_after_seconds(error: SlackApiError) -> Optional[float]:
+    value = error.response.headers.get("Retry-After") or error.response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitedAsyncWebClient(AsyncWebClient):
+    """AsyncWebClient that paces every call through a per-method token bucket
+    and retries rate-limited calls after Slack's Retry-After with jitter."""
+
+    async def api_call(self, api_method: str, **kwargs) -> AsyncSlackResponse:
+        bucket = get_bucket(api_method)
+        for attempt in range(MAX_RETRIES + 1):
+            RATE_LIMIT_WAIT.labels(api_method).inc(await bucket.acquire())
+            try:
+                with SLACK_LATENCY.labels(api_method).time():
+                    response = await super().api_call(api_method, **kwargs)
+                bucket.on_success()
+                return response
+            except SlackApiError as e:
+                if e.response.status_code != 429 or attempt == MAX_RETRIES:
+                    raise
+                RATE_LIMITED.labels(api_method).inc()
+                retry_after = retry_after_seconds(e)
+                bucket.on_throttled(retry_after)
+                backoff = (retry_after or 2 ** attempt) + random.uniform(0, 1 + attempt)
+                print(f"⏳ Rate limited on {api_method}, retrying in {backoff:.1f}s.")
+                RATE_LIMIT_WAIT.labels(api_method).inc(backoff)
+                await asyncio.sleep(backoff)
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from config import SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_BYTES, SEARCH_CACHE_WATERMARK_INTERVAL
+from logs.checkpoints import load_checkpoint
+from utils.elastic_search import search_budget
+
+
+def date_bounds(start_date: Optional[str], end_date: Optional[str]) -> Tuple[float, float]:
+    # Datepicker values are whole days; widen the end to cover all of it.
+    lower = float("-inf")
+    upper = float("inf")
+    if start_date and end_date:
+        lower = datetime.fromisoformat(start_date).replace(tzinfo=timezone.utc).timestamp()
+        upper = datetime.fromisoformat(end_date).replace(tzinfo=timezone.utc).timestamp() + 86400
+    return lower, upper
+
+
+class CacheEntry:
+    def __init__(self, value: Any, size: int, bounds: Tuple[float, float], watermarks: Tuple[int, int]) -> None:
+        self.value = value
+        self.size = size
+        self.bounds = bounds
+        self.watermarks = watermarks
+        self.expires = time.monotonic() + SEARCH_CACHE_TTL
+
+
+class SearchCache:
+    """TTL + LRU cache of search results, capped by approximate serialized size.
+
+    Concurrent identical lookups share one in-flight query. Entries are dropped
+    once ingestion has written data inside their date range since they were
+    filled, using the checkpoint watermarks published by the fetcher process.
+    """
+
+    def __init__(self, max_bytes: int = SEARCH_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.watermarks: Tuple[int, int] = (0, 0)
+        self.watermarks_checked = 0.0
+
+    @staticmethod
+    def make_key(**params: Any) -> str:
+        return json.dumps(params, sort_keys=True, default=str)
+
+    async def refresh_watermarks(self) -> None:
+        if time.monotonic() - self.watermarks_checked < SEARCH_CACHE_WATERMARK_INTERVAL:
+            return
+        self.watermarks_checked = time.monotonic()
+        checkpoint = await load_checkpoint()
+        self.watermarks = (
+            checkpoint.get("oldest_timestamp") or 0,
+            checkpoint.get("newest_timestamp") or 0,
+        )
+
+    def is_stale(self, entry: CacheEntry) -> bool:
+        if time.monotonic() >= entry.expires:
+            return True
+        lower, upper = entry.bounds
+        old_oldest, old_newest = entry.watermarks
+        oldest, newest = self.watermarks
+        # New data landed above the old high-watermark or below the old low one.
+        return (newest > old_newest and upper > old_newest) or (
+            oldest < old_oldest and lower < old_oldest
+        )
+
+    def evict(self, key: str) -> None:
+        entry = self.entries.pop(key)
+        self.bytes -= entry.size
+
+    def store(self, key: str, value: Any, bounds: Tuple[float, float]) -> None:
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.evict(key)
+        self.entries[key] = CacheEntry(value, size, bounds, self.watermarks)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self.evict(next(iter(self.entries)))
+
+    async def get_or_compute(
+        self,
+        key: str,
+        bounds: Tuple[float, float],
+        compute: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        await self.refresh_watermarks()
+        entry = self.entries.get(key)
+        if entry is not None:
+            if not self.is_stale(entry):
+                self.entries.move_to_end(key)
+                return entry.value
+            self.evict(key)
+
+        if key in self.in_flight:
+            return await asyncio.shield(self.in_flight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved in case nobody else was waiting on it.
+            future.exception()
+            raise
+        finally:
+            del self.in_flight[key]
+        future.set_result(value)
+        if cacheable(value):
+            self.store(key, value, bounds)
+        return value
+
+
+search_cache = SearchCache()
+
+
+def is_cacheable_result(result: Tuple[Any, ...]) -> bool:
+    data = result[0]
+    budget = search_budget.get()
+    if budget is not None and budget.timed_out:
+        return False
+    return bool(data) and not (isinstance(data[0], dict) and "error" in data[0])
+
+
+async def cached_search(
+    compute: Callable[[], Awaitable[Tuple[Any, ...]]],
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    **params: Any,
+) -> Tuple[Any, ...]:
+    key = search_cache.make_key(start_date=start_date, end_date=end_date, **params)
+    return await search_cache.get_or_compute(
+        key, date_bounds(start_date, end_date), compute, is_cacheable_result
+    )
@@ -0,0 +1,135 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Tuple
+from config import SEARCH_WORKERS, SEARCH_DEADLINE, SEARCH_MAX_QUEUED_PER_USER
+from utils.elastic_search import SearchBudget, search_budget
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchQueueFull(Exception):
+    pass
+
+
+class SearchJob:
+    def __init__(self, compute: Callable[[], Awaitable[Any]], deadline: float) -> None:
+        self.compute = compute
+        self.deadline = deadline
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class SearchExecutor:
+    """Runs interactive searches on a fixed pool of workers.
+
+    Each moderator has their own queue and workers take from the queues in
+    turn, so one moderator's burst of searches cannot starve everyone else.
+    A moderator may have at most SEARCH_MAX_QUEUED_PER_USER searches queued
+    or running at once. Background work (next-page prefetches) waits in a
+    separate, bounded queue that workers only serve when no moderator is
+    waiting. Every search gets a deadline counted from submission: ES is
+    asked to return whatever it has by then, and the request is cancelled if
+    it still runs past it.
+    """
+
+    def __init__(
+        self,
+        workers: int = SEARCH_WORKERS,
+        deadline: float = SEARCH_DEADLINE,
+        max_queued_per_user: int = SEARCH_MAX_QUEUED_PER_USER,
+    ) -> None:
+        self.workers = workers
+        self.deadline = deadline
+        self.max_queued_per_user = max_queued_per_user
+        self.queues: Dict[str, Deque[SearchJob]] = {}
+        self.ready: Deque[str] = deque()
+        self.outstanding: Dict[str, int] = {}
+        self.background: Deque[SearchJob] = deque()
+        self.pending = asyncio.Semaphore(0)
+        self.worker_tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        # Workers are started on first use so they run on Bolt's event loop.
+        if not self.worker_tasks:
+            self.worker_tasks = [asyncio.create_task(self.work()) for _ in range(self.workers)]
+
+    async def run(
+        self, user_id: str, compute: Callable[[], Awaitable[Any]], background: bool = False
+    ) -> Tuple[Any, bool]:
+        """Returns the search result and whether ES cut it short at the deadline."""
+        self.start()
+        job = SearchJob(compute, time.monotonic() + self.deadline)
+        if background:
+            if len(self.background) >= self.workers:
+                raise SearchQueueFull("⏳ Too much background work is queued.")
+            self.background.append(job)
+        else:
+            if self.outstanding.get(user_id, 0) >= self.max_queued_per_user:
+                raise SearchQueueFull("⏳ You have too many searches running. Please wait for them to finish.")
+            # Counted until the caller has its answer, whether queued or running.
+            self.outstanding[user_id] = self.outstanding.get(user_id, 0) + 1
+            job.future.add_done_callback(lambda _: self.finished(user_id))
+            queue = self.queues.setdefault(user_id, deque())
+            if not queue:
+                self.ready.append(user_id)
+            queue.append(job)
+        self.pending.release()
+        return await job.future
+
+    def finished(self, user_id: str) -> None:
+        self.outstanding[user_id] -= 1
+        if not self.outstanding[user_id]:
+            del self.outstanding[user_id]
+
+    def next_job(self) -> SearchJob:
+        if not self.ready:
+            return self.background.popleft()
+        user_id = self.ready.popleft()
+        queue = self.queues[user_id]
+        job = queue.popleft()
+        if queue:
+            self.ready.append(user_id)
+        else:
+            del self.queues[user_id]
+        return job
+
+    async def work(self) -> None:
+        while True:
+            await self.pending.acquire()
+            job = self.next_job()
+            if job.future.done():
+                # The caller stopped waiting while the job was queued.
+                continue
+            await self.execute(job)
+
+    async def execute(self, job: SearchJob) -> None:
+        remaining = job.deadline - time.monotonic()
+        if remaining <= 0:
+            job.future.set_exception(SearchTimeout("⏱️ The search timed out while waiting for a free worker."))
+            return
+
+        budget = SearchBudget(job.deadline)
+        token = search_budget.set(budget)
+        try:
+            task = asyncio.create_task(job.compute())
+        finally:
+            search_budget.reset(token)
+        job.future.add_done_callback(lambda future: task.cancel() if future.cancelled() else None)
+
+        done, _ = await asyncio.wait({task}, timeout=remaining)
+        if job.future.done():
+            return
+        if not done:
+            task.cancel()
+            job.future.set_exception(SearchTimeout(f"⏱️ The search did not finish within {self.deadline:g}s."))
+        elif task.cancelled():
+            job.future.cancel()
+        elif task.exception():
+            job.future.set_exception(task.exception())
+        else:
+            job.future.set_result((task.result(), budget.timed_out))
+
+
+search_executor = SearchExecutor()
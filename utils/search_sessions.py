@@ -0,0 +1,204 @@
+import asyncio
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+from config import SEARCH_SESSION_TTL, SEARCH_SESSION_MAX
+from utils.elastic_search import standard_search, unique_ip_search, unique_user_search, close_pit
+from utils.search_cache import cached_search
+from utils.search_executor import search_executor, SearchQueueFull, SearchTimeout
+
+PAGE_SIZE = 10
+
+# Rows, total and whether the search was cut short at its deadline.
+Page = Tuple[List[Dict[str, Any]], int, bool]
+
+
+async def run_search(
+    search_type: str, user_id: str, ip_address: str, page: int, start_date: str, end_date: str,
+    after: Optional[Any] = None, before: Optional[Any] = None, pit_id: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+    if search_type in ("standard_search", "date_range"):
+        data, total, pit_id = await standard_search(
+            user_id=user_id, ip_address=ip_address, page=page,
+            start_date=start_date, end_date=end_date,
+            pit_id=pit_id, search_after=after, search_before=before,
+        )
+    elif search_type == "unique_user_for_ip":
+        data, total = await unique_user_search(ip_address=ip_address, page=page,
+            start_date=start_date, end_date=end_date, after=after, before=before)
+    elif search_type == "unique_ip_for_user":
+        data, total = await unique_ip_search(user_id=user_id, page=page,
+            start_date=start_date, end_date=end_date, after=after, before=before)
+    else:
+        raise ValueError(f"Invalid search type: {search_type}")
+
+    return data, total, pit_id
+
+
+async def get_search_results(
+    search_type: str, user_id: str, ip_address: str, page: int, start_date: str, end_date: str,
+    after: Optional[Any] = None, before: Optional[Any] = None, pit_id: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+    return await cached_search(
+        lambda: run_search(
+            search_type, user_id, ip_address, page, start_date, end_date, after, before, pit_id
+        ),
+        start_date,
+        end_date,
+        search_type=search_type,
+        user_id=user_id,
+        ip_address=ip_address,
+        page=page,
+        after=after,
+        before=before,
+        pit_id=pit_id,
+    )
+
+
+def page_cursors(data: List[Dict[str, Any]], search_type: str) -> Tuple[Any, Any]:
+    # Sort values where the search returned them, composite keys otherwise.
+    page_key = {"unique_user_for_ip": "user_id", "unique_ip_for_user": "ip"}.get(search_type, "sort")
+    return data[0].get("sort", data[0].get(page_key)), data[-1].get("sort", data[-1].get(page_key))
+
+
+def is_error(data: List[Dict[str, Any]]) -> bool:
+    return bool(data) and isinstance(data[0], dict) and "error" in data[0]
+
+
+class SearchSession:
+    """One moderator's search: its query, point in time and the pages fetched
+    so far. Each page is computed from its neighbour's cursors, at most once."""
+
+    def __init__(
+        self,
+        search_type: str,
+        owner: str,
+        user_id: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        confidence_threshold: Optional[float] = None,
+    ) -> None:
+        self.token = secrets.token_urlsafe(12)
+        self.search_type = search_type
+        self.owner = owner
+        self.user_id = user_id
+        self.ip_address = ip_address
+        self.start_date = start_date
+        self.end_date = end_date
+        # Only used by find_alts sessions, which are kept for their export.
+        self.confidence_threshold = confidence_threshold
+        self.pit_id: Optional[str] = None
+        self.pages: Dict[int, Page] = {}
+        self.fetching: Dict[int, asyncio.Task] = {}
+        self.prefetching: Set[int] = set()
+        self.touched = time.monotonic()
+
+    async def fetch(self, page: int, background: bool = False) -> Page:
+        if page > 1 and page - 1 not in self.pages and page + 1 not in self.pages:
+            # Partial and failed pages are not cached but still offer Next, and
+            # a search without a cursor would return page 1 again. Walk forward
+            # from the nearest cached page so this one has a cursor to follow.
+            for previous in range(max((p for p in self.pages if p < page), default=0) + 1, page):
+                data, _, partial = await self.get_page(previous)
+                if not data or is_error(data) or partial:
+                    return [{"error": f"Page {previous} could not be loaded in full, so page {page} "
+                             "cannot be reached yet. Please try again."}], 0, False
+        after = before = None
+        if page - 1 in self.pages:
+            after = page_cursors(self.pages[page - 1][0], self.search_type)[1]
+        elif page + 1 in self.pages:
+            before = page_cursors(self.pages[page + 1][0], self.search_type)[0]
+        (data, total, pit_id), partial = await search_executor.run(
+            self.owner,
+            lambda: get_search_results(
+                self.search_type, self.user_id, self.ip_address, page,
+                self.start_date, self.end_date, after, before, self.pit_id,
+            ),
+            background=background,
+        )
+        self.pit_id = pit_id or self.pit_id
+        # Partial pages are shown once but fetched again on the next visit.
+        if data and not is_error(data) and not partial:
+            self.pages[page] = (data, total, partial)
+        return data, total, partial
+
+    def start_fetch(self, page: int, background: bool = False) -> asyncio.Task:
+        task = self.fetching.get(page)
+        if task is None:
+            task = asyncio.create_task(self.fetch(page, background))
+            self.fetching[page] = task
+            if background:
+                self.prefetching.add(page)
+
+            def done(_: asyncio.Task) -> None:
+                self.fetching.pop(page, None)
+                self.prefetching.discard(page)
+
+            task.add_done_callback(done)
+        return task
+
+    async def get_page(self, page: int) -> Page:
+        self.touched = time.monotonic()
+        if page in self.pages:
+            return self.pages[page]
+        task = self.fetching.get(page)
+        if task is not None and page in self.prefetching:
+            try:
+                return await asyncio.shield(task)
+            except (SearchQueueFull, SearchTimeout):
+                # The prefetch was dropped or expired behind interactive
+                # searches; fetch the page as the moderator's own search.
+                pass
+        return await asyncio.shield(self.start_fetch(page))
+
+    def prefetch(self, page: int) -> None:
+        # Warms the page after the one just shown so Next is served from memory.
+        if page in self.pages or page in self.fetching:
+            return
+        total = self.pages.get(page - 1, ([], 0, False))[1]
+        if total <= (page - 1) * PAGE_SIZE:
+            return
+
+        def done(task: asyncio.Task) -> None:
+            # A full background queue just means the page is fetched on click.
+            if not task.cancelled() and task.exception() and not isinstance(task.exception(), SearchQueueFull):
+                print(f"⚠️ Error prefetching page {page}: {task.exception()}")
+
+        self.start_fetch(page, background=True).add_done_callback(done)
+
+
+class SearchSessions:
+    def __init__(self, ttl: float = SEARCH_SESSION_TTL, max_sessions: int = SEARCH_SESSION_MAX) -> None:
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, SearchSession]" = OrderedDict()
+
+    def discard(self, token: str) -> None:
+        session = self.sessions.pop(token)
+        if session.pit_id:
+            asyncio.create_task(close_pit(session.pit_id))
+
+    def expire(self) -> None:
+        now = time.monotonic()
+        for token in [token for token, session in self.sessions.items() if now - session.touched >= self.ttl]:
+            self.discard(token)
+        while len(self.sessions) > self.max_sessions:
+            self.discard(next(iter(self.sessions)))
+
+    def create(self, search_type: str, owner: str, **params: Any) -> SearchSession:
+        session = SearchSession(search_type, owner, **params)
+        self.sessions[session.token] = session
+        self.expire()
+        return session
+
+    def get(self, token: Optional[str]) -> Optional[SearchSession]:
+        self.expire()
+        session = self.sessions.get(token) if token else None
+        if session is not None:
+            self.sessions.move_to_end(token)
+        return session
+
+
+search_sessions = SearchSessions()
@@ -1,8 +1,11 @@
-import asyncio
 import json
 from math import ceil
 from typing import List, Dict, Any, Optional
-from config import app, ALLOWED_CHANNEL_ID
+import asyncio
+import time
+from config import app, ALLOWED_CHANNEL_ID, PROFILE_REFRESH_INTERVAL
+from utils.auth_cache import AuthCache
+from utils.profile_cache import profile_cache
 
 
 def create_field(text: str, value: str) -> Dict[str, str]:
@@ -24,6 +27,19 @@ def create_fields(
     ]
 
 
+def export_buttons(session_token: str) -> List[Dict[str, Any]]:
+    # Like the page buttons, exports only name the search session.
+    return [
+        {
+            "type": "button",
+            "text": {"type": "plain_text", "text": f"Export {file_format.upper()}"},
+            "action_id": f"export_{file_format}",
+            "value": json.dumps({"session": session_token, "format": file_format}),
+        }
+        for file_format in ("csv", "jsonl")
+    ]
+
+
 def format_slack_message(
     data: List[Dict[str, Any]],
     total: int,
@@ -35,12 +51,14 @@ def format_slack_message(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     search_type: str = "standard_search",
+    session_token: Optional[str] = None,
+    partial: bool = False,
 ) -> List[Dict[str, Any]]:
     blocks = []
 
     search_details = []
     if user_id:
-        search_details.append(f"User: <@{user_id}>")
+        search_details.append(f"User: <@{user_id}> ({profile_cache.describe(user_id)})")
     if ip_address:
         search_details.append(f"IP: {ip_address}")
     if start_date and end_date:
@@ -64,6 +82,9 @@ def format_slack_message(
         }
     )
 
+    if data and isinstance(data, list) and isinstance(data[0], dict) and "error" in data[0]:
+        # Searches report failures as a single error row.
+        data = data[0]
     if isinstance(data, dict) and "error" in data:
         blocks.append(
             {
@@ -97,6 +118,7 @@ def format_slack_message(
         "standard_search": [
             ("User ID:", "user_id"),
             ("Username:", "username"),
+            ("Profile:", "profile"),
             ("First Login:", "date_first"),
             ("Last Login:", "date_last"),
             ("IP Address:", "ip"),
@@ -107,6 +129,7 @@ def format_slack_message(
         ],
         "unique_user_for_ip": [
             ("User ID:", "user_id"),
+            ("Profile:", "profile"),
             ("First Login:", "date_first"),
             ("Last Login:", "date_last"),
             ("Total Logins:", "count")
@@ -120,6 +143,7 @@ def format_slack_message(
         "date_range": [
             ("User ID:", "user_id"),
             ("Username:", "username"),
+            ("Profile:", "profile"),
             ("First Login:", "date_first"),
             ("Last Login:", "date_last"),
             ("IP Address:", "ip"),
@@ -133,120 +157,104 @@ def format_slack_message(
     start_index = (page - 1) * size + 1
     for index, doc in enumerate(data, start=start_index):
         source = doc.get("_source", doc)
+        if "user_id" in source:
+            source = {**source, "profile": profile_cache.describe(source["user_id"])}
         fields_list = field_mappings.get(search_type, field_mappings["standard_search"])
         fields = create_fields(index, source, fields_list)
         blocks.extend([{"type": "section", "fields": fields}, {"type": "divider"}])
 
+    # The buttons only name the server-side search session and the page;
+    # the query, point in time and cursors stay with the session.
     buttons = []
-    if page > 1:
+    if page > 1 and session_token:
         buttons.append(
             {
                 "type": "button",
                 "text": {"type": "plain_text", "text": "Prev Page"},
                 "action_id": "prev_page",
-                "value": json.dumps(
-                    {
-                        "page": page - 1,
-                        "user_id": user_id,
-                        "ip_address": ip_address,
-                        "search_type": search_type,
-                        "start_date": start_date,
-                        "end_date": end_date,
-                    }
-                ),
+                "value": json.dumps({"session": session_token, "page": page - 1}),
             }
         )
-    if total > page * size:
+    if total > page * size and session_token:
         buttons.append(
             {
                 "type": "button",
                 "text": {"type": "plain_text", "text": "Next Page"},
                 "action_id": "load_more",
-                "value": json.dumps(
-                    {
-                        "page": page + 1,
-                        "user_id": user_id,
-                        "ip_address": ip_address,
-                        "search_type": search_type,
-                        "start_date": start_date,
-                        "end_date": end_date,
-                    }
-                ),
+                "value": json.dumps({"session": session_token, "page": page + 1}),
             }
         )
 
+    if session_token:
+        buttons.extend(export_buttons(session_token))
     if buttons:
         blocks.append({"type": "actions", "elements": buttons})
 
+    footer = f"Total Entries: {total}"
+    if partial:
+        footer += " | ⚠️ Partial results: the search hit its time limit"
     blocks.append(
         {
             "type": "context",
-            "elements": [{"type": "mrkdwn", "text": f"Total Entries: {total}"}],
+            "elements": [{"type": "mrkdwn", "text": footer}],
         }
     )
 
     return blocks
 
 
-async def check_bot_channel():
-    try:
-        channels = await fetch_all_channels()
-        bot_channels = [
-            channel
-            for channel in channels
-            if channel.get("is_member") and channel["id"] != ALLOWED_CHANNEL_ID
-        ]
-
-        for channel in bot_channels:
-            await remove_bot_from_channel(channel)
-
-    except Exception as e:
-        print(f"⚠️ Error checking bot channels: {e}")
-
-
-async def fetch_all_channels():
-    channels = []
-    cursor = None
-    while True:
-        response = await app.client.conversations_list(
-            types="public_channel,private_channel", limit=1000, cursor=cursor
-        )
-        channels.extend(response.get("channels", []))
-        cursor = response.get("response_metadata", {}).get("next_cursor")
-        if not cursor:
-            break
-        await asyncio.sleep(2)
-    return channels
-
-
 async def remove_bot_from_channel(channel):
     try:
         await app.client.conversations_leave(channel=channel["id"])
         await app.client.chat_postMessage(
             channel=ALLOWED_CHANNEL_ID,
-            text=f"🚨 The bot has been removed from a non-allowed channel (ID: {channel['id']}, Name: {channel.get('name')}, Creator: {channel.get('creator')}).",
+            text=f"🚨 The bot has been removed from a non-allowed channel (ID: {channel['id']}, Name: {channel.get('name')}, Creator: {channel.get('creator')})."
+            + (f" It was added by <@{channel['inviter']}>." if channel.get("inviter") else ""),
         )
     except Exception as e:
         print(f"⚠️ Error leaving channel {channel['id']}: {e}")
 
 
+async def lookup_user(user_id: str) -> Dict[str, Any]:
+    user_info = await app.client.users_info(user=user_id)
+    return user_info["user"]
+
+
+auth_cache = AuthCache(lookup_user)
+
+
 async def is_user_authorized(user_id: str) -> bool:
     try:
-        user_info = await app.client.users_info(user=user_id)
-        return user_info["user"].get("is_admin", False) or user_info["user"].get(
-            "is_owner", False
-        )
+        return await auth_cache.is_authorized(user_id)
     except Exception as e:
         print(f"⚠️ Error checking user authorization: {e}")
         return False
 
 
-# TODO: Fix this function
-# async def report_bot_added(user_id: str, channel_id: str):
-#     try:
-#         await app.client.chat_postMessage(
-#             channel=ALLOWED_CHANNEL_ID,
-#             text=f"🚨 The bot was added to an unauthorized channel (ID: {channel_id}) by <@{user_id}>."
-#         )
-#     except Exception as e:
-#         print(f"⚠️ Error reporting bot addition: {e}")
+async def refresh_profiles() -> None:
+    # users.list carries admin/owner flags too, so one pass also warms the
+    # authorization cache. A pass can take minutes; entries written after it
+    # started (user_change events, users.info lookups) are newer than its
+    # pages and are not overwritten.
+    started = time.monotonic()
+    cursor = None
+    count = 0
+    while True:
+        response = await app.client.users_list(limit=200, cursor=cursor)
+        for user in response.get("members", []):
+            profile_cache.update(user, since=started)
+            auth_cache.update_from_profile(user, since=started)
+            count += 1
+        cursor = response.get("response_metadata", {}).get("next_cursor")
+        if not cursor:
+            break
+    print(f"👥 Loaded {count} user profiles.")
+
+
+async def run_profile_refresh(interval: float = PROFILE_REFRESH_INTERVAL) -> None:
+    while True:
+        try:
+            await refresh_profiles()
+        except Exception as e:
+            print(f"⚠️ Error loading user profiles: {e}")
+        await asyncio.sleep(interval)
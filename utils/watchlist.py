@@ -0,0 +1,94 @@
+import ipaddress
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+from elasticsearch.helpers import async_bulk, async_scan
+from config import es, WATCHLIST_INDEX
+from utils.batch import USER_ID_PATTERN
+
+WATCH_KINDS = {"user_id": "User", "ip": "IP", "cidr": "CIDR"}
+
+
+def parse_watch_entries(text: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    entries: Dict[str, str] = {}
+    invalid: List[str] = []
+    for token in re.split(r"[\s,;]+", text):
+        token = token.strip().strip("<>@").split("|")[0]
+        if not token or token in entries:
+            continue
+        try:
+            if "/" in token:
+                network = ipaddress.ip_network(token, strict=False)
+                if network.num_addresses == 1:
+                    entries[str(network.network_address)] = "ip"
+                else:
+                    entries[str(network)] = "cidr"
+            else:
+                entries[str(ipaddress.ip_address(token))] = "ip"
+        except ValueError:
+            if USER_ID_PATTERN.match(token):
+                entries[token] = "user_id"
+            else:
+                invalid.append(token)
+    return [(kind, value) for value, kind in entries.items()], invalid
+
+
+def watch_doc_id(kind: str, value: str) -> str:
+    return f"{kind}:{value}"
+
+
+async def create_watchlist_index() -> None:
+    await es.options(ignore_status=[400]).indices.create(
+        index=WATCHLIST_INDEX,
+        body={
+            "mappings": {
+                "properties": {
+                    "kind": {"type": "keyword"},
+                    "value": {"type": "keyword"},
+                    "note": {"type": "text"},
+                    "added_by": {"type": "keyword"},
+                    "added_at": {"type": "date"},
+                }
+            }
+        },
+    )
+
+
+async def load_watch_entries() -> List[Dict[str, Any]]:
+    return [
+        hit["_source"]
+        async for hit in async_scan(
+            es, index=WATCHLIST_INDEX, query={"query": {"match_all": {}}}, ignore_unavailable=True
+        )
+    ]
+
+
+async def add_watch_entries(entries: List[Tuple[str, str]], note: str, added_by: str) -> int:
+    added_at = datetime.now(timezone.utc)
+    created, _ = await async_bulk(
+        es,
+        [
+            {
+                "_op_type": "index",
+                "_index": WATCHLIST_INDEX,
+                "_id": watch_doc_id(kind, value),
+                "_source": {"kind": kind, "value": value, "note": note, "added_by": added_by, "added_at": added_at},
+            }
+            for kind, value in entries
+        ],
+        refresh="wait_for",
+    )
+    return created
+
+
+async def remove_watch_entries(entries: List[Tuple[str, str]]) -> int:
+    removed, _ = await async_bulk(
+        es,
+        [
+            {"_op_type": "delete", "_index": WATCHLIST_INDEX, "_id": watch_doc_id(kind, value)}
+            for kind, value in entries
+        ],
+        raise_on_error=False,
+        refresh="wait_for",
+    )
+    return removed
@@ -0,0 +1,93 @@
+import aiohttp
+from typing import Any, Dict, List
+from config import ALLOWED_CHANNEL_ID, SLACK_BOT_TOKEN, BATCH_MAX_ENTITIES
+from utils.batch import parse_entities, investigate
+from utils.search_executor import search_executor
+from slack_sdk import WebClient
+
+LINES_PER_SECTION = 20
+
+
+async def download_file(url: str) -> str:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url, headers={"Authorization": f"Bearer {SLACK_BOT_TOKEN}"}) as response:
+            response.raise_for_status()
+            return await response.text(errors="replace")
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    label = f"<@{summary['value']}>" if summary["kind"] == "user_id" else f"`{summary['value']}`"
+    if "error" in summary:
+        return f"• {label} — ⚠️ {summary['error']}"
+    if not summary["pairs"]:
+        return f"• {label} — no logins found"
+    counted = "IPs" if summary["kind"] == "user_id" else "users"
+    last_seen = (summary["last_seen"] or "N/A")[:16].replace("T", " ")
+    countries = ", ".join(summary["countries"]) or "N/A"
+    return f"• {label} — last seen {last_seen} · {summary['pairs']} {counted} · {countries}"
+
+
+def format_batch_message(
+    summaries: List[Dict[str, Any]], invalid: List[str], skipped: int, partial: bool = False
+) -> List[Dict[str, Any]]:
+    found = sum(1 for summary in summaries if summary.get("pairs"))
+    blocks: List[Dict[str, Any]] = [
+        {
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": f"*Batch Investigation*\n{found}/{len(summaries)} entities have logins"},
+        },
+        {"type": "divider"},
+    ]
+    lines = [format_summary(summary) for summary in summaries]
+    for start in range(0, len(lines), LINES_PER_SECTION):
+        blocks.append({
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": "\n".join(lines[start:start + LINES_PER_SECTION])},
+        })
+
+    notes = []
+    if partial:
+        notes.append("⚠️ Partial results: the search hit its time limit")
+    if skipped:
+        notes.append(f"{skipped} entries over the limit of {BATCH_MAX_ENTITIES} were skipped")
+    if invalid:
+        notes.append(f"Not a user ID or IP: {', '.join(invalid[:10])}" + ("…" if len(invalid) > 10 else ""))
+    if notes:
+        blocks.append({"type": "context", "elements": [{"type": "mrkdwn", "text": "\n".join(notes)}]})
+    return blocks
+
+
+async def handle_batch(client: WebClient, ack, body, view):
+    await ack()
+
+    values = view["state"]["values"]
+    text = values.get("entities_input", {}).get("entities_input", {}).get("value") or ""
+    for file in values.get("entities_file", {}).get("entities_file", {}).get("files") or []:
+        try:
+            text += "\n" + await download_file(file["url_private_download"])
+        except Exception as e:
+            print(f"⚠️ Error downloading batch file {file.get('id')}: {e}")
+
+    entities, invalid = parse_entities(text)
+    print(f"📋 Batch investigation of {len(entities)} entities")
+    if not entities:
+        await client.chat_postMessage(
+            channel=ALLOWED_CHANNEL_ID,
+            text="⚠️ No user IDs or IP addresses found in the batch request.",
+        )
+        return
+
+    try:
+        summaries, partial = await search_executor.run(
+            body["user"]["id"], lambda: investigate(entities[:BATCH_MAX_ENTITIES])
+        )
+        await client.chat_postMessage(
+            channel=ALLOWED_CHANNEL_ID,
+            blocks=format_batch_message(summaries, invalid, max(0, len(entities) - BATCH_MAX_ENTITIES), partial),
+            text=f"Batch investigation of {len(summaries)} users and IPs",
+        )
+    except Exception as e:
+        await client.chat_postMessage(
+            channel=ALLOWED_CHANNEL_ID,
+            text=f"❌ Error during batch investigation: {str(e)}",
+        )
@@ -1,21 +1,21 @@
 from config import ALLOWED_CHANNEL_ID
-from utils.slack_utils import format_slack_message
-from utils.elastic_search import standard_search, unique_user_search, unique_ip_search
+from utils.slack_utils import format_slack_message, export_buttons
+from utils.search_sessions import search_sessions
+from utils.alts import find_alts
+from utils.search_executor import search_executor
 from slack_sdk import WebClient
 
 
-async def handle_search(client: WebClient, ack, view):
+async def handle_search(client: WebClient, ack, body, view):
     await ack()
 
-    search_type = view["state"]["values"]["search_type"]["type_selection"][
-        "selected_option"
-    ]["value"]
-    user_input = view["state"]["values"]["user_input"]["user_id_input"]["value"]
-    ip_input = view["state"]["values"]["ip_input"]["ip_input"]["value"]
-    start_date = view["state"]["values"]["date_range_start"]["start_date"][
-        "selected_date"
-    ]
-    end_date = view["state"]["values"]["date_range_end"]["end_date"]["selected_date"]
+    values = view["state"]["values"]
+    search_type = values["search_type"]["type_selection"]["selected_option"]["value"]
+    user_input = values["user_input"]["user_id_input"]["value"]
+    # The Find Alts modal only has the user and threshold inputs.
+    ip_input = values.get("ip_input", {}).get("ip_input", {}).get("value")
+    start_date = values.get("date_range_start", {}).get("start_date", {}).get("selected_date")
+    end_date = values.get("date_range_end", {}).get("end_date", {}).get("selected_date")
 
     print(f"📝 Search parameters - Type: {search_type}, User: {user_input}, IP: {ip_input}, Date range: {start_date} to {end_date}")
     loading_message = await client.chat_postMessage(
@@ -39,37 +39,38 @@ async def handle_search(client: WebClient, ack, view):
         "end_date": end_date,
         "page": 1, 
     }
+    header_messages = {
+        "standard_search": "🔍 Standard Search Results",
+        "unique_user_for_ip": "👤 Unique User IDs for IP",
+        "unique_ip_for_user": "🌐 Unique IPs for User ID",
+    }
 
     try:
         print(f"Executing {search_type} search...")
-        if search_type == "standard_search":
-            data, total = await standard_search(
+        if search_type != "find_alts":
+            search_type = search_type if search_type in header_messages else "standard_search"
+            session = search_sessions.create(
+                search_type,
+                body["user"]["id"],
                 user_id=search_params["user_id"],
                 ip_address=search_params["ip_address"],
                 start_date=search_params["start_date"],
                 end_date=search_params["end_date"],
-                page=search_params["page"],
             )
-            header_message = "🔍 Standard Search Results"
-        elif search_type == "unique_user_for_ip":
-            data, total = await unique_user_search(
-                ip_address=search_params["ip_address"],
-                start_date=search_params["start_date"],
-                end_date=search_params["end_date"],
-                page=search_params["page"]
+            data, total, partial = await session.get_page(search_params["page"])
+            header_message = header_messages[search_type]
+        else:
+            confidence_threshold = float(values["confidence_threshold"]["confidence_input"]["value"])
+            potential_alts, partial = await search_executor.run(
+                body["user"]["id"], lambda: find_alts(search_params["user_id"], confidence_threshold)
             )
-            header_message = "👤 Unique User IDs for IP"
-        elif search_type == "unique_ip_for_user":
-            data, total = await unique_ip_search(
+            # Kept so the export buttons can name it instead of carrying the query.
+            session = search_sessions.create(
+                "find_alts",
+                body["user"]["id"],
                 user_id=search_params["user_id"],
-                start_date=search_params["start_date"],
-                end_date=search_params["end_date"],
-                page=search_params["page"]
+                confidence_threshold=confidence_threshold,
             )
-            header_message = "🌐 Unique IPs for User ID"
-        elif search_type == "find_alts":
-            confidence_threshold = float(view["state"]["values"]["confidence_threshold"]["confidence_input"]["value"])
-            potential_alts = await find_alts(search_params["user_id"], confidence_threshold)
             
             if not potential_alts:
                 await client.chat_postMessage(
@@ -97,7 +98,18 @@ async def handle_search(client: WebClient, ack, view):
                 for alt in page_alts:
                     blocks.append({
                         "type": "section",
-                        "text": {"type": "mrkdwn", "text": f"• <@{alt['user_id']}>\n  Confidence: {alt['confidence']:.2f}\n  Shared IP: {alt['shared_ip']}"},
+                        "text": {"type": "mrkdwn", "text": f"• <@{alt['user_id']}>\n  Confidence: {alt['confidence']:.2f}\n  Shared IP: {alt['shared_ip']} ({alt['shared_ips']} shared in total)"},
+                    })
+
+                if page == total_pages and partial:
+                    blocks.append({
+                        "type": "context",
+                        "elements": [{"type": "mrkdwn", "text": "⚠️ Partial results: the search hit its time limit"}],
+                    })
+                if page == total_pages:
+                    blocks.append({
+                        "type": "actions",
+                        "elements": export_buttons(session.token),
                     })
 
                 await client.chat_postMessage(
@@ -107,16 +119,6 @@ async def handle_search(client: WebClient, ack, view):
                 )
 
             return
-        else:
-            data, total = await standard_search(
-                user_id=search_params["user_id"],
-                ip_address=search_params["ip_address"],
-                start_date=search_params["start_date"],
-                end_date=search_params["end_date"],
-                page=search_params["page"],
-            )
-            header_message = "🔍 Search Results"
-
 
         message_blocks = format_slack_message(
             data,
@@ -128,6 +130,8 @@ async def handle_search(client: WebClient, ack, view):
             start_date=search_params["start_date"],
             end_date=search_params["end_date"],
             search_type=search_type,
+            session_token=session.token,
+            partial=partial,
         )
         await client.chat_update(
             channel=ALLOWED_CHANNEL_ID,
@@ -135,6 +139,7 @@ async def handle_search(client: WebClient, ack, view):
             blocks=message_blocks,
             text=header_message,
         )
+        session.prefetch(search_params["page"] + 1)
         print("Search process completed successfully!")
     except Exception as e:
         await client.chat_update(
@@ -0,0 +1,34 @@
+from config import ALLOWED_CHANNEL_ID
+from utils.watchlist import parse_watch_entries, add_watch_entries, remove_watch_entries
+from slack_sdk import WebClient
+
+
+async def handle_watchlist(client: WebClient, ack, body, view):
+    values = view["state"]["values"]
+    operation = values["watch_operation"]["operation"]["selected_option"]["value"]
+    note = values.get("watch_note", {}).get("note", {}).get("value") or ""
+    entries, invalid = parse_watch_entries(values["watch_entries"]["entries"]["value"] or "")
+
+    if invalid or not entries:
+        await ack(
+            response_action="errors",
+            errors={"watch_entries": f"Not a user ID, IP or CIDR range: {', '.join(invalid[:5])}" if invalid else "Enter at least one entry."},
+        )
+        return
+    await ack()
+
+    moderator = body["user"]["id"]
+    print(f"👁️ Watchlist {operation} of {len(entries)} entries by {moderator}")
+    try:
+        if operation == "remove":
+            changed = await remove_watch_entries(entries)
+            text = f"👁️ <@{moderator}> removed {changed} entries from the watchlist."
+        else:
+            changed = await add_watch_entries(entries, note, moderator)
+            text = f"👁️ <@{moderator}> added {changed} entries to the watchlist" + (f": {note}" if note else ".")
+        await client.chat_postMessage(channel=ALLOWED_CHANNEL_ID, text=text)
+    except Exception as e:
+        await client.chat_postMessage(
+            channel=ALLOWED_CHANNEL_ID,
+            text=f"❌ Error updating the watchlist: {str(e)}",
+        )